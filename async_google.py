@@ -0,0 +1,123 @@
+import asyncio
+import threading
+from google.auth.transport.requests import Request
+from google_auth import get_credentials
+from rate_limiter import get_rate_limiter
+import config
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+DRIVE_BASE_URL = 'https://www.googleapis.com/drive/v3/'
+
+class AsyncGoogleError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+        self.headers = headers or {}
+
+def error_details(error):
+    """Map an AsyncGoogleError to what the rate limiter needs to decide on a retry"""
+    if isinstance(error, AsyncGoogleError):
+        return error.status, error.headers.get('Retry-After'), str(error)
+    return None
+
+class AsyncGoogleClient:
+    """asyncio client for Drive media downloads; listings and Sheets calls stay on the sync clients"""
+    # Downloads are the only calls that are both numerous and independent. List
+    # and changes pages are chained by page token, and sheet writes go through
+    # one ordered, batching writer under the Sheets quota, so neither gains from overlap
+    
+    def __init__(self, credentials=None, max_concurrency=None):
+        if aiohttp is None:
+            raise RuntimeError("The async API client needs aiohttp: pip install aiohttp")
+        
+        self.credentials = credentials or get_credentials('drive')
+        self.max_concurrency = max_concurrency or config.ASYNC_MAX_CONCURRENCY
+        self.drive_url = config.DRIVE_API_ENDPOINT or DRIVE_BASE_URL
+        self.limiter = get_rate_limiter()
+        self.session = None
+        self.semaphore = None
+        self.token_lock = None
+    
+    async def start(self):
+        # One keep-alive connection pool shared by every request in flight
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=config.ASYNC_REQUEST_TIMEOUT)
+        )
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.token_lock = asyncio.Lock()
+    
+    async def close(self):
+        if self.session:
+            await self.session.close()
+            self.session = None
+    
+    async def __aenter__(self):
+        await self.start()
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.close()
+    
+    async def auth_headers(self):
+        """Refresh the shared token once, however many requests are waiting on it"""
+        async with self.token_lock:
+            if not self.credentials.valid:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, self.credentials.refresh, Request())
+        
+        headers = {}
+        self.credentials.apply(headers)
+        return headers
+    
+    async def request(self, method, url, params=None, json=None, raw=False, max_bytes=None):
+        """Send a request under the shared Drive quota, retrying 429s and 5xx"""
+        kind = 'read' if method == 'GET' else 'write'
+        return await self.limiter.call_async('drive', kind, self.send, error_details,
+                                             method, url, params, json, raw, max_bytes)
+    
+    async def send(self, method, url, params=None, json=None, raw=False, max_bytes=None):
+        async with self.semaphore:
+            headers = await self.auth_headers()
+            async with self.session.request(method, url, params=params, json=json, headers=headers) as response:
+                if response.status >= 400:
+                    raise AsyncGoogleError(response.status, await response.text(), dict(response.headers))
+                
+                if not raw:
+                    return await response.json(content_type=None)
+                
+                # Stream media in chunks so oversized files are cut off early
+                body = bytearray()
+                async for chunk in response.content.iter_chunked(config.DOWNLOAD_CHUNK_SIZE):
+                    body.extend(chunk)
+                    if max_bytes and len(body) > max_bytes:
+                        raise AsyncGoogleError(413, f"download exceeds {max_bytes} bytes")
+                return bytes(body)
+    
+    async def get_media(self, file_id, max_bytes=None):
+        return await self.request('GET', self.drive_url + f'files/{file_id}', params={'alt': 'media'},
+                                  raw=True, max_bytes=max_bytes or config.MAX_DOWNLOAD_BYTES)
+
+class AsyncClientThread:
+    """Runs an AsyncGoogleClient on a background event loop for synchronous callers"""
+    
+    def __init__(self, client=None):
+        self.client = client or AsyncGoogleClient()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.call(self.client.start).result()
+    
+    def call(self, method, *args, **kwargs):
+        """Schedule a client coroutine; returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(method(*args, **kwargs), self.loop)
+    
+    def close(self):
+        self.call(self.client.close).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
@@ -0,0 +1,186 @@
+"""Offline batch import of a directory or zip archive of CV PDFs
+
+Extracts fields on every core without touching the Drive or Sheets APIs
+and streams rows to CSV or Parquet with the sheet's columns. Archive
+members are read straight from the zip, never extracted to disk.
+    python batch.py cvs.zip --output cvs.csv
+    python batch.py ./cvs --output cvs.parquet --upload
+"""
+import argparse
+import csv
+import hashlib
+import os
+import sys
+import time
+import zipfile
+from multiprocessing import Pool
+from pdf_extractor import PDFExtractor
+from sheets_manager import SheetsManager, HEADERS
+import config
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+SOURCE = 'Batch Import'
+
+_extractor = None
+_archives = {}
+
+def list_inputs(path):
+    """Return (archive, member) pairs for every PDF; archive is None for plain files"""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            return [(path, info.filename) for info in archive.infolist()
+                    if not info.is_dir() and info.filename.lower().endswith('.pdf')]
+    
+    items = []
+    for root, _, files in os.walk(path):
+        for name in sorted(files):
+            if name.lower().endswith('.pdf'):
+                items.append((None, os.path.join(root, name)))
+    return items
+
+def read_input(archive_path, member):
+    if archive_path is None:
+        with open(member, 'rb') as f:
+            return f.read()
+    
+    # Each worker keeps its own handle open on the archive
+    if archive_path not in _archives:
+        _archives[archive_path] = zipfile.ZipFile(archive_path)
+    return _archives[archive_path].read(member)
+
+def row_key(pdf_bytes):
+    """File ID for a batch row; the same PDF gets the same key in every import"""
+    return 'batch:' + hashlib.md5(pdf_bytes).hexdigest()
+
+def process_item(item):
+    """Extract one PDF in a worker process and return its sheet row"""
+    global _extractor
+    if _extractor is None:
+        _extractor = PDFExtractor()
+    
+    archive_path, member = item
+    filename = os.path.basename(member)
+    # Unreadable files are keyed by their path instead
+    key = f"batch:{archive_path or ''}:{member}"
+    try:
+        pdf_bytes = read_input(archive_path, member)
+        key = row_key(pdf_bytes)
+        text, extracted_data = _extractor.extract_text_and_fields(pdf_bytes, filename)
+    except Exception as e:
+        print(f"Error processing {member}: {e}")
+        text, extracted_data = "", None
+    
+    if not text:
+        extracted_data = {'status': 'failed'}
+    return SheetsManager.build_row(extracted_data, filename, SOURCE, file_id=key)
+
+class CSVWriter:
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(HEADERS)
+    
+    def write(self, rows):
+        self.writer.writerows(row[:len(HEADERS)] for row in rows)
+    
+    def close(self):
+        self.file.close()
+
+class ParquetWriter:
+    def __init__(self, path):
+        if pyarrow is None:
+            raise RuntimeError("Parquet output needs pyarrow: pip install pyarrow")
+        self.schema = pyarrow.schema([(name, pyarrow.string()) for name in HEADERS])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+    
+    def write(self, rows):
+        columns = [[row[i] for row in rows] for i in range(len(HEADERS))]
+        self.writer.write_table(pyarrow.Table.from_arrays(columns, schema=self.schema))
+    
+    def close(self):
+        self.writer.close()
+
+def upload(rows, sheets_manager=None):
+    """Append all new rows to the sheet in as few requests as possible"""
+    sheets_manager = sheets_manager or SheetsManager()
+    
+    # Rows are keyed by their File ID, never by filename alone, so a batch
+    # row and a Drive upload that share a name do not shadow each other
+    new_rows = []
+    seen = set()
+    for row in rows:
+        key = row[7]
+        if key in seen or sheets_manager.check_duplicate(row[3], key):
+            continue
+        seen.add(key)
+        new_rows.append(row)
+    print(f"Uploading {len(new_rows)} rows ({len(rows) - len(new_rows)} already in the sheet or repeated)")
+    
+    for start in range(0, len(new_rows), config.BATCH_UPLOAD_ROWS):
+        chunk = new_rows[start:start + config.BATCH_UPLOAD_ROWS]
+        first_row = sheets_manager.append_rows(chunk)
+        for offset, row in enumerate(chunk):
+            sheets_manager.record_written(row[3], row[7], row_number=first_row + offset if first_row else None)
+
+def run(input_path, output, output_format=None, workers=None, chunksize=None, upload_rows=False):
+    items = list_inputs(input_path)
+    if not items:
+        print(f"No PDFs found in {input_path}")
+        return 0
+    
+    output_format = output_format or ('parquet' if output.endswith('.parquet') else 'csv')
+    writer = ParquetWriter(output) if output_format == 'parquet' else CSVWriter(output)
+    workers = workers or config.PARSE_WORKERS
+    chunksize = chunksize or config.BATCH_CHUNKSIZE
+    print(f"Processing {len(items)} PDFs with {workers} workers")
+    
+    uploaded = [] if upload_rows else None
+    batch = []
+    done = 0
+    start = time.perf_counter()
+    try:
+        with Pool(workers) as pool:
+            for row in pool.imap_unordered(process_item, items, chunksize=chunksize):
+                batch.append(row)
+                done += 1
+                if len(batch) >= config.BATCH_WRITE_ROWS:
+                    writer.write(batch)
+                    if uploaded is not None:
+                        uploaded.extend(batch)
+                    batch = []
+                if done % 500 == 0:
+                    print(f"{done}/{len(items)} PDFs ({done / (time.perf_counter() - start):.1f}/s)")
+            if batch:
+                writer.write(batch)
+                if uploaded is not None:
+                    uploaded.extend(batch)
+    finally:
+        writer.close()
+    
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {done} rows to {output} in {elapsed:.1f}s ({done / elapsed:.1f} PDFs/s)")
+    
+    if uploaded is not None:
+        upload(uploaded)
+    return done
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract CV fields from a directory or zip of PDFs")
+    parser.add_argument('input', help="Directory or .zip archive of PDFs")
+    parser.add_argument('--output', required=True, help="Output .csv or .parquet file")
+    parser.add_argument('--format', choices=['csv', 'parquet'], help="Output format (default: from extension)")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: PARSE_WORKERS)")
+    parser.add_argument('--chunksize', type=int, help="PDFs handed to a worker at a time")
+    parser.add_argument('--upload', action='store_true', help="Append the rows to the Google Sheet when done")
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.input):
+        print(f"Error: {args.input} not found")
+        sys.exit(1)
+    
+    run(args.input, args.output, args.format, args.workers, args.chunksize, args.upload)
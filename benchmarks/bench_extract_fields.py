@@ -0,0 +1,51 @@
+"""Micro-benchmark for PDFExtractor.extract_fields and extract_fields_batch on extracted CV text
+
+Run from the repository root:
+    python -m benchmarks.bench_extract_fields
+"""
+import random
+import time
+from pdf_extractor import PDFExtractor
+
+FIRST_NAMES = ['Youssef', 'Fatima', 'Mohamed', 'Salma', 'Amine', 'Khadija', 'John', 'Sarah']
+LAST_NAMES = ['El Amrani', 'Benali', 'Alaoui', 'Tazi', 'Smith', 'Berrada', 'Idrissi', 'Chraibi']
+PHONES = ['+212 6 12 34 56 78', '06-12-34-56-78', '0712345678', '+212712345678', '05 22 33 44 55', '212 661 234 567']
+FILLER = [
+    'EXPERIENCES PROFESSIONNELLES',
+    'Developpement d applications web avec Django et React',
+    'Gestion de projets et coordination des equipes techniques',
+    'FORMATION',
+    'Master en informatique, Universite Mohammed V, Rabat',
+    'SKILLS',
+    'Python, SQL, Docker, Kubernetes, Linux administration',
+    'Languages: Arabe, Francais, Anglais',
+]
+
+def make_text(rng, filler_lines):
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    email = name.lower().replace(' ', '.') + rng.choice(['@gmail.com', '@outlook.com', '@indeedemail.com'])
+    lines = [name.upper(), 'Curriculum Vitae', f"Email: {email}", f"Tel: {rng.choice(PHONES)}"]
+    lines += [rng.choice(FILLER) for _ in range(filler_lines)]
+    return '\n'.join(lines), f"CV_{name.replace(' ', '_')}.pdf"
+
+def run(docs=2000, filler_lines=60, seed=1):
+    rng = random.Random(seed)
+    corpus = [make_text(rng, filler_lines) for _ in range(docs)]
+    extractor = PDFExtractor()
+    
+    start = time.perf_counter()
+    for text, filename in corpus:
+        extractor.extract_fields(text, filename)
+    elapsed = time.perf_counter() - start
+    
+    print(f"extract_fields: {docs} docs, {elapsed * 1e6 / docs:.1f} us/doc")
+    
+    start = time.perf_counter()
+    extractor.extract_fields_batch([text for text, _ in corpus], [filename for _, filename in corpus])
+    batch_elapsed = time.perf_counter() - start
+    
+    print(f"extract_fields_batch: {docs} docs, {batch_elapsed * 1e6 / docs:.1f} us/doc")
+    return elapsed / docs
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,164 @@
+"""Synthetic CV corpus with a known answer key
+
+Generates single- and multi-page text PDFs in English and French layouts
+with the Moroccan phone formats seen in real intake. Run from the
+repository root:
+    python -m benchmarks.corpus --out bench_corpus --docs 200
+"""
+import argparse
+import json
+import os
+import random
+
+FIRST_NAMES = ['Youssef', 'Fatima', 'Mohamed', 'Salma', 'Amine', 'Khadija', 'Omar', 'Imane', 'John', 'Sarah']
+LAST_NAMES = ['Benali', 'Alaoui', 'Tazi', 'Berrada', 'Idrissi', 'Chraibi', 'Bennani', 'Smith', 'Martin']
+DOMAINS = ['gmail.com', 'outlook.com', 'yahoo.fr', 'hotmail.com', 'menara.ma']
+
+# (format, mobile) pairs; the answer is always the +212 normalized form
+PHONE_FORMATS = [
+    ('+212 {0} {1}{2} {3}{4} {5}{6} {7}{8}', True),
+    ('+212{0}{1}{2}{3}{4}{5}{6}{7}{8}', True),
+    ('0{0}{1}{2}{3}{4}{5}{6}{7}{8}', True),
+    ('0{0} {1}{2} {3}{4} {5}{6} {7}{8}', True),
+    ('0{0}-{1}{2}-{3}{4}-{5}{6}-{7}{8}', True),
+    ('0{0}.{1}{2}.{3}{4}.{5}{6}.{7}{8}', True),
+    ('212 {0}{1}{2} {3}{4}{5} {6}{7}{8}', True),
+    ('05 {1}{2} {3}{4} {5}{6} {7}{8}', False),
+]
+
+LAYOUTS = {
+    'en': {
+        'title': 'Curriculum Vitae',
+        'email': 'Email: {}',
+        'phone': 'Phone: {}',
+        'sections': ['PROFESSIONAL EXPERIENCE', 'EDUCATION', 'SKILLS', 'LANGUAGES', 'PROJECTS'],
+        'filler': [
+            'Developed web applications with Django and React',
+            'Led a team of four engineers on a logistics platform',
+            'Bachelor of Science in Computer Science',
+            'Python, SQL, Docker, Linux administration',
+            'Arabic, French, English',
+            'Improved report generation time by forty percent',
+        ],
+    },
+    'fr': {
+        'title': 'CV',
+        'email': 'E-mail : {}',
+        'phone': 'Tel : {}',
+        'sections': ['EXPERIENCES PROFESSIONNELLES', 'FORMATION UNIVERSITAIRE', 'COMPETENCES PROFESSIONNELLES', 'LANGUES', 'LOISIRS'],
+        'filler': [
+            'Developpement d applications web avec Django et React',
+            'Gestion de projets et coordination des equipes techniques',
+            'Master en informatique, Universite Mohammed V, Rabat',
+            'Administration de serveurs Linux et bases de donnees',
+            'Arabe, Francais, Anglais',
+            'Stage de fin d etudes dans une societe de conseil',
+        ],
+    },
+}
+
+LINES_PER_PAGE = 45
+
+def make_pdf(pages):
+    """Build a minimal text PDF; pages is a list of lists of lines"""
+    objects = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    
+    for lines in pages:
+        ops = ["BT /F1 11 Tf 14 TL 50 780 Td"]
+        for line in lines:
+            escaped = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+            ops.append(f"({escaped}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode('latin-1')
+        
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        kids.append(len(objects))
+    
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % k for k in kids) + b"] /Count %d >>" % len(kids)
+    
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+def make_phone(rng):
+    fmt, mobile = rng.choice(PHONE_FORMATS)
+    prefix = rng.choice('67') if mobile else '5'
+    digits = [prefix] + [str(rng.randint(0, 9)) for _ in range(8)]
+    return fmt.format(*digits), '+212' + ''.join(digits)
+
+def make_document(rng, index, pages=1):
+    """Return (pdf_bytes, filename, answer) for one synthetic CV"""
+    language = rng.choice(list(LAYOUTS))
+    layout = LAYOUTS[language]
+    
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    email = f"{first}.{last}{rng.randint(1, 99)}@{rng.choice(DOMAINS)}".lower()
+    phone_text, phone = make_phone(rng)
+    
+    lines = [f"{first} {last}".upper(), layout['title'], layout['email'].format(email), layout['phone'].format(phone_text)]
+    page_lines = []
+    for _ in range(pages):
+        while len(lines) < LINES_PER_PAGE:
+            if rng.random() < 0.15:
+                lines.append(rng.choice(layout['sections']))
+            else:
+                lines.append(rng.choice(layout['filler']))
+        page_lines.append(lines)
+        lines = []
+    
+    filename = f"CV_{first}_{last}_{index}.pdf"
+    answer = {
+        'name': f"{first} {last}",
+        'email': email,
+        'phone': phone,
+        'pages': pages,
+        'language': language,
+    }
+    return make_pdf(page_lines), filename, answer
+
+def generate_corpus(docs=200, seed=42, multi_page_ratio=0.3, max_pages=8):
+    """Return a list of (pdf_bytes, filename, answer) tuples"""
+    rng = random.Random(seed)
+    corpus = []
+    for index in range(docs):
+        pages = rng.randint(2, max_pages) if rng.random() < multi_page_ratio else 1
+        corpus.append(make_document(rng, index, pages))
+    return corpus
+
+def write_corpus(out_dir, corpus):
+    """Write PDFs and answer_key.json to a directory"""
+    os.makedirs(out_dir, exist_ok=True)
+    answer_key = {}
+    for pdf_bytes, filename, answer in corpus:
+        with open(os.path.join(out_dir, filename), 'wb') as f:
+            f.write(pdf_bytes)
+        answer_key[filename] = answer
+    
+    with open(os.path.join(out_dir, 'answer_key.json'), 'w') as f:
+        json.dump(answer_key, f, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic CV corpus")
+    parser.add_argument('--out', default='bench_corpus')
+    parser.add_argument('--docs', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    write_corpus(args.out, generate_corpus(args.docs, args.seed))
+    print(f"Wrote {args.docs} PDFs and answer_key.json to {args.out}")
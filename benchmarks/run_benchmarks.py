@@ -0,0 +1,226 @@
+"""Benchmark harness for the extraction and processing hot paths
+
+Measures PDFExtractor text and field extraction, scalar and batched, on a synthetic corpus
+with a known answer key, then end-to-end CVProcessor throughput against
+stubbed Drive and Sheets services. Results are printed and written as
+JSON so runs can be compared over time. Run from the repository root:
+    python -m benchmarks.run_benchmarks --docs 200 --output bench_results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import multiprocessing
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import config
+from pdf_extractor import PDFExtractor
+from pdf_backends import available_backends
+from benchmarks.corpus import generate_corpus
+from benchmarks.stub_services import StubBackend, build_services
+
+def bench_extract_text(extractor, corpus):
+    pages = sum(answer['pages'] for _, _, answer in corpus)
+    start = time.perf_counter()
+    for pdf_bytes, _, _ in corpus:
+        extractor.extract_text(pdf_bytes, max_pages=0)
+    elapsed = time.perf_counter() - start
+    return {
+        'docs': len(corpus),
+        'pages': pages,
+        'seconds': round(elapsed, 4),
+        'docs_per_sec': round(len(corpus) / elapsed, 2),
+        'pages_per_sec': round(pages / elapsed, 2),
+    }
+
+def bench_extract_text_and_fields(extractor, corpus):
+    start = time.perf_counter()
+    for pdf_bytes, filename, _ in corpus:
+        extractor.extract_text_and_fields(pdf_bytes, filename)
+    elapsed = time.perf_counter() - start
+    return {
+        'docs': len(corpus),
+        'seconds': round(elapsed, 4),
+        'docs_per_sec': round(len(corpus) / elapsed, 2),
+    }
+
+def bench_extract_fields(extractor, corpus, repeat=5):
+    texts = [(extractor.extract_text(pdf_bytes, max_pages=0), filename, answer)
+             for pdf_bytes, filename, answer in corpus]
+    
+    correct = {'name': 0, 'email': 0, 'phone': 0}
+    for text, filename, answer in texts:
+        result = extractor.extract_fields(text, filename)
+        for field in correct:
+            correct[field] += result[field] == answer[field]
+    
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text, filename, _ in texts:
+            extractor.extract_fields(text, filename)
+    elapsed = time.perf_counter() - start
+    
+    return {
+        'docs': len(texts),
+        'us_per_doc': round(elapsed * 1e6 / (len(texts) * repeat), 2),
+        'accuracy': {field: round(count / len(texts), 4) for field, count in correct.items()},
+    }
+
+def bench_extract_fields_batch(extractor, corpus, repeat=5):
+    """Scalar extract_fields against extract_fields_batch on the same texts"""
+    texts = [extractor.extract_text(pdf_bytes, max_pages=0) for pdf_bytes, _, _ in corpus]
+    filenames = [filename for _, filename, _ in corpus]
+    
+    scalar = [extractor.extract_fields(text, filename) for text, filename in zip(texts, filenames)]
+    identical = extractor.extract_fields_batch(texts, filenames) == scalar
+    
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text, filename in zip(texts, filenames):
+            extractor.extract_fields(text, filename)
+    scalar_elapsed = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for _ in range(repeat):
+        extractor.extract_fields_batch(texts, filenames)
+    batch_elapsed = time.perf_counter() - start
+    
+    return {
+        'docs': len(texts),
+        'scalar_docs_per_sec': round(len(texts) * repeat / scalar_elapsed, 2),
+        'batch_docs_per_sec': round(len(texts) * repeat / batch_elapsed, 2),
+        'identical': identical,
+    }
+
+def peak_rss_mb():
+    # VmHWM starts fresh in a spawned process; Linux ru_maxrss carries over the parent's peak
+    if os.path.exists('/proc/self/status'):
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def measure_backend(name, corpus):
+    """Run one backend over the corpus in a fresh process so peak RSS is its own"""
+    extractor = PDFExtractor(backend=name, fallback=False)
+    baseline = peak_rss_mb()
+    pages = sum(answer['pages'] for _, _, answer in corpus)
+    
+    correct = 0
+    start = time.perf_counter()
+    for pdf_bytes, filename, answer in corpus:
+        text = extractor.extract_text(pdf_bytes, max_pages=0)
+        result = extractor.extract_fields(text, filename)
+        correct += all(result[field] == answer[field] for field in ('name', 'email', 'phone'))
+    elapsed = time.perf_counter() - start
+    
+    return {
+        'backend': name,
+        'docs': len(corpus),
+        'seconds': round(elapsed, 4),
+        'docs_per_sec': round(len(corpus) / elapsed, 2),
+        'pages_per_sec': round(pages / elapsed, 2),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'rss_growth_mb': round(peak_rss_mb() - baseline, 1),
+        'docs_fully_correct': correct,
+    }
+
+def bench_backends(corpus):
+    """Compare every installed PDF backend on full-text extraction"""
+    results = []
+    for name in available_backends():
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            results.append(pool.submit(measure_backend, name, corpus).result())
+    return results
+
+def bench_processor(corpus, pipeline=False, latency=0.0):
+    """Run CVProcessor.process_all_existing against the stub backend"""
+    # Imported here so config overrides below apply to the processor's state files
+    from main import CVProcessor
+    from drive_monitor import DriveMonitor
+    
+    backend = StubBackend(corpus, folder_id=config.DRIVE_FOLDER_ID or 'folder', latency=latency)
+    
+    with tempfile.TemporaryDirectory() as state_dir:
+        config.DRIVE_FOLDER_ID = backend.folder_id
+        config.SPREADSHEET_ID = config.SPREADSHEET_ID or 'spreadsheet'
+        config.DUPLICATE_INDEX_FILE = os.path.join(state_dir, 'duplicate_index.db')
+        config.RESULT_CACHE_FILE = os.path.join(state_dir, 'result_cache.db')
+        config.JOB_QUEUE_FILE = os.path.join(state_dir, 'job_queue.db')
+        config.BACKFILL_CHECKPOINT_FILE = os.path.join(state_dir, 'backfill_checkpoint.txt')
+        config.PIPELINE_ENABLED = pipeline
+        # The stub backend has no quota; measure the processor, not the limiter
+        for name in ('DRIVE_READS', 'DRIVE_WRITES', 'SHEETS_READS', 'SHEETS_WRITES'):
+            setattr(config, f"{name}_PER_MINUTE", 10 ** 9)
+        
+        drive_service, sheets_service = build_services(backend)
+        
+        def drive_monitor_factory():
+            return DriveMonitor(drive_service=build_services(backend)[0])
+        
+        with contextlib.redirect_stdout(io.StringIO()):
+            processor = CVProcessor(drive_service, sheets_service, drive_monitor_factory)
+            start = time.perf_counter()
+            processor.process_all_existing()
+            elapsed = time.perf_counter() - start
+            if processor.pipeline:
+                processor.pipeline.close()
+    
+    return {
+        'mode': 'pipeline' if pipeline else 'serial',
+        'docs': len(corpus),
+        'rows_written': len(backend.rows),
+        'seconds': round(elapsed, 4),
+        'docs_per_sec': round(len(corpus) / elapsed, 2),
+        'simulated_latency_sec': latency,
+        'api_calls': dict(backend.calls),
+    }
+
+def run(docs=200, seed=42, pipeline=False, latency=0.0, backends=False):
+    corpus = generate_corpus(docs, seed)
+    extractor = PDFExtractor()
+    
+    results = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'corpus': {'docs': docs, 'seed': seed},
+        'pdf_backend': extractor.backends[0].name,
+        'extract_text': bench_extract_text(extractor, corpus),
+        'extract_text_and_fields': bench_extract_text_and_fields(extractor, corpus),
+        'extract_fields': bench_extract_fields(extractor, corpus),
+        'extract_fields_batch': bench_extract_fields_batch(extractor, corpus),
+        'processor': [bench_processor(corpus, latency=latency)],
+    }
+    if pipeline:
+        results['processor'].append(bench_processor(corpus, pipeline=True, latency=latency))
+    if backends:
+        results['backends'] = bench_backends(corpus)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark CV extraction and processing")
+    parser.add_argument('--docs', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--pipeline', action='store_true', help="Also benchmark the concurrent pipeline")
+    parser.add_argument('--latency', type=float, default=0.0, help="Simulated seconds per API request")
+    parser.add_argument('--backends', action='store_true', help="Also compare docs/sec and peak RSS per PDF backend")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+    
+    results = run(args.docs, args.seed, args.pipeline, args.latency, args.backends)
+    print(json.dumps(results, indent=2))
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
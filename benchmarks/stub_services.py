@@ -0,0 +1,188 @@
+"""In-process fake Drive and Sheets backends for benchmarks
+
+The real googleapiclient service objects are built from the bundled
+discovery documents and pointed at StubHttp, so request building, media
+downloads and response parsing all run the production code paths without
+any network.
+"""
+import json
+import re
+import threading
+import hashlib
+from urllib.parse import urlparse, parse_qs, unquote
+import httplib2
+from google.auth.credentials import AnonymousCredentials
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build
+
+class StubBackend:
+    """Shared state for a fake Drive folder and spreadsheet"""
+    
+    def __init__(self, corpus, folder_id='folder', latency=0.0, folder_ids=None):
+        self.folder_id = folder_id
+        self.latency = latency
+        self.files = {}
+        self.order = []
+        # Several folders take turns, one file each, for multi-route runs
+        folder_ids = folder_ids or [folder_id]
+        for index, (pdf_bytes, filename, _) in enumerate(corpus):
+            file_id = f"file{index}"
+            folder_id = folder_ids[index % len(folder_ids)]
+            self.files[file_id] = {
+                'id': file_id,
+                'name': filename,
+                'size': str(len(pdf_bytes)),
+                'md5Checksum': hashlib.md5(pdf_bytes).hexdigest(),
+                'modifiedTime': '2024-01-01T00:00:00.000Z',
+                'mimeType': 'application/pdf',
+                'parents': [folder_id],
+                'content': pdf_bytes,
+            }
+            self.order.append(file_id)
+        
+        self.headers = None
+        self.rows = []
+        self.lock = threading.Lock()
+        self.calls = {}
+    
+    def count(self, name):
+        with self.lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+class StubHttp:
+    """httplib2.Http stand-in that answers Drive and Sheets requests from a StubBackend"""
+    
+    def __init__(self, backend):
+        self.backend = backend
+    
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        if self.backend.latency:
+            threading.Event().wait(self.backend.latency)
+        
+        url = urlparse(uri)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        path = unquote(url.path)
+        
+        if '/drive/v3/files' in path:
+            return self.drive_files(path, query, headers or {})
+        if '/v4/spreadsheets/' in path:
+            return self.sheets(path, method, json.loads(body) if body else {}, parse_qs(url.query))
+        return self.respond(404, {'error': {'message': f"Unhandled {method} {path}"}})
+    
+    def respond(self, status, payload, extra=None):
+        headers = {'status': str(status), 'content-type': 'application/json'}
+        headers.update(extra or {})
+        content = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+        return httplib2.Response(headers), content
+    
+    def drive_files(self, path, query, headers):
+        backend = self.backend
+        file_id = path.rsplit('/files', 1)[1].strip('/')
+        
+        if file_id and query.get('alt') == 'media':
+            backend.count('files.get_media')
+            content = backend.files[file_id]['content']
+            start, end = 0, len(content) - 1
+            if 'range' in headers:
+                start, end = (int(x) for x in headers['range'].split('=')[1].split('-'))
+            chunk = content[start:end + 1]
+            extra = {'content-range': f"bytes {start}-{start + len(chunk) - 1}/{len(content)}"}
+            return self.respond(206, chunk, extra)
+        
+        backend.count('files.list')
+        folders = set(re.findall(r"'([^']+)' in parents", query.get('q', '')))
+        order = [i for i in backend.order if not folders or folders & set(backend.files[i]['parents'])]
+        page_size = int(query.get('pageSize', 100))
+        start = int(query.get('pageToken', 0))
+        ids = order[start:start + page_size]
+        files = [{k: v for k, v in backend.files[i].items() if k != 'content'} for i in ids]
+        payload = {'files': files}
+        if start + page_size < len(order):
+            payload['nextPageToken'] = str(start + page_size)
+        return self.respond(200, payload)
+    
+    def sheets(self, path, method, body, query):
+        backend = self.backend
+        if path.endswith('values:batchUpdate'):
+            backend.count('values.batchUpdate')
+            for data in body.get('data', []):
+                self.write_range(data['range'], data['values'])
+            return self.respond(200, {'totalUpdatedRows': len(body.get('data', []))})
+        
+        if path.endswith(':batchUpdate'):
+            backend.count('spreadsheets.batchUpdate')
+            replies = [{'addSheet': {'properties': {'sheetId': 1}}} if 'addSheet' in request else {}
+                       for request in body.get('requests', [])]
+            return self.respond(200, {'replies': replies})
+        
+        if path.endswith(':append'):
+            backend.count('values.append')
+            with backend.lock:
+                start = len(backend.rows) + 2
+                backend.rows.extend(body.get('values', []))
+                end = len(backend.rows) + 1
+            return self.respond(200, {'updates': {'updatedRange': f"CV_Data!A{start}:I{end}"}})
+        
+        if method == 'PUT':
+            backend.count('values.update')
+            self.write_range(path.rsplit('/', 1)[-1], body['values'])
+            return self.respond(200, {})
+        
+        if path.endswith('values:batchGet'):
+            backend.count('values.batchGet')
+            return self.respond(200, {'valueRanges': [self.read_range(a1) for a1 in query.get('ranges', [])]})
+        
+        backend.count('values.get')
+        return self.respond(200, self.read_range(path.rsplit('/', 1)[-1]))
+    
+    def grid(self):
+        """Header row followed by data rows, as sheet row 1 onwards"""
+        return [self.backend.headers or []] + self.backend.rows
+    
+    def parse_range(self, a1):
+        """Columns and rows of an A1 range such as CV_Data!D2:I, zero-based and end-exclusive"""
+        cells = a1.rsplit('!', 1)[-1].split(':')
+        first = re.match(r'([A-Z]+)(\d*)', cells[0]).groups()
+        last = re.match(r'([A-Z]+)(\d*)', cells[-1]).groups()
+        row_end = int(last[1]) if last[1] else None
+        return ord(first[0]) - ord('A'), ord(last[0]) - ord('A') + 1, int(first[1] or 1) - 1, row_end
+    
+    def read_range(self, a1):
+        col_start, col_end, row_start, row_end = self.parse_range(a1)
+        with self.backend.lock:
+            rows = [row[col_start:col_end] for row in self.grid()[row_start:row_end]]
+        # Like the real API, trailing empty rows and cells are left out
+        rows = [list(row) for row in rows]
+        for row in rows:
+            while row and row[-1] == '':
+                row.pop()
+        while rows and not rows[-1]:
+            rows.pop()
+        return {'range': a1, 'values': rows} if rows else {'range': a1}
+    
+    def write_range(self, a1, values):
+        col_start, _, row_start, _ = self.parse_range(a1)
+        backend = self.backend
+        with backend.lock:
+            for offset, new in enumerate(values):
+                number = row_start + offset
+                if number == 0:
+                    row = list(backend.headers or [])
+                else:
+                    while len(backend.rows) < number:
+                        backend.rows.append([])
+                    row = list(backend.rows[number - 1])
+                row += [''] * (col_start + len(new) - len(row))
+                row[col_start:col_start + len(new)] = new
+                if number == 0:
+                    backend.headers = row
+                else:
+                    backend.rows[number - 1] = row
+
+def build_services(backend):
+    """Return (drive_service, sheets_service) wired to the stub backend"""
+    drive = build('drive', 'v3', http=AuthorizedHttp(AnonymousCredentials(), http=StubHttp(backend)),
+                  static_discovery=True)
+    sheets = build('sheets', 'v4', http=AuthorizedHttp(AnonymousCredentials(), http=StubHttp(backend)),
+                   static_discovery=True)
+    return drive, sheets
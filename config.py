@@ -9,9 +9,114 @@ DRIVE_FOLDER_ID = os.getenv('DRIVE_FOLDER_ID')
 SPREADSHEET_ID = os.getenv('SPREADSHEET_ID')
 SHEET_NAME = os.getenv('SHEET_NAME', 'CV_Data')
 
+# Several teams in one process: a JSON file of folder -> spreadsheet routes, used instead of the two IDs above
+ROUTES_FILE = os.getenv('ROUTES_FILE')
+DRIVE_QUERY_FOLDERS = int(os.getenv('DRIVE_QUERY_FOLDERS', 50))
+
+# Optional API endpoint overrides, e.g. a local fake Drive server for testing
+DRIVE_API_ENDPOINT = os.getenv('DRIVE_API_ENDPOINT')
+SHEETS_API_ENDPOINT = os.getenv('SHEETS_API_ENDPOINT')
+
 # File monitoring
+# Intake source: 'drive' (DRIVE_FOLDER_ID) or 'local' (PDFs dropped in WATCH_FOLDER, e.g. an SFTP share)
+CV_SOURCE = os.getenv('CV_SOURCE', 'drive')
 WATCH_FOLDER = os.getenv('WATCH_FOLDER', './watch_folder')
+LOCAL_DEBOUNCE_SECONDS = float(os.getenv('LOCAL_DEBOUNCE_SECONDS', 0.5))
 POLL_INTERVAL = int(os.getenv('POLL_INTERVAL', 30))
+# Adaptive polling: the interval shrinks by POLL_BACKOFF while new files arrive and grows by it when idle
+POLL_ADAPTIVE = os.getenv('POLL_ADAPTIVE', 'true').lower() == 'true'
+POLL_MIN_INTERVAL = float(os.getenv('POLL_MIN_INTERVAL', 5))
+POLL_MAX_INTERVAL = float(os.getenv('POLL_MAX_INTERVAL', 300))
+POLL_BACKOFF = float(os.getenv('POLL_BACKOFF', 2))
+LIST_PAGE_SIZE = int(os.getenv('LIST_PAGE_SIZE', 1000))
+BACKFILL_CHECKPOINT_FILE = os.getenv('BACKFILL_CHECKPOINT_FILE', 'backfill_checkpoint.txt')
+
+# Downloads are streamed into memory in chunks and never written to the working directory.
+# Spooling only bounds memory on the serial path; the pipeline and isolated workers get the whole file as bytes
+DOWNLOAD_CHUNK_SIZE = int(os.getenv('DOWNLOAD_CHUNK_SIZE', 1024 * 1024))
+DOWNLOAD_SPOOL_BYTES = int(os.getenv('DOWNLOAD_SPOOL_BYTES', 8 * 1024 * 1024))
+# Larger files are never downloaded (0 for no limit); well above the size of a large scanned CV
+MAX_DOWNLOAD_BYTES = int(os.getenv('MAX_DOWNLOAD_BYTES', 100 * 1024 * 1024))
+
+# PDF text extraction: stop reading pages once name, email and phone are found
+PDF_MAX_PAGES = int(os.getenv('PDF_MAX_PAGES', 10))
+PDF_EARLY_EXIT = os.getenv('PDF_EARLY_EXIT', 'true').lower() == 'true'
+
+# PDF text backend: 'auto' (fastest installed), 'pypdfium2', 'pdfminer' or 'pypdf2'; others are tried if it fails
+PDF_BACKEND = os.getenv('PDF_BACKEND', 'auto')
+
+# OCR fallback for scanned PDFs (requires pytesseract, pdf2image and the tesseract/poppler binaries)
+OCR_ENABLED = os.getenv('OCR_ENABLED', 'false').lower() == 'true'
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', 2))
+OCR_MIN_CHARS_PER_PAGE = int(os.getenv('OCR_MIN_CHARS_PER_PAGE', 100))
+OCR_MAX_PAGES = int(os.getenv('OCR_MAX_PAGES', 3))
+OCR_PAGE_TIMEOUT = int(os.getenv('OCR_PAGE_TIMEOUT', 30))
+OCR_DPI = int(os.getenv('OCR_DPI', 200))
+OCR_LANGUAGES = os.getenv('OCR_LANGUAGES', 'eng+fra')
+
+# Drive monitor mode: 'poll' (modifiedTime query) or 'changes' (Changes API cursor)
+DRIVE_MONITOR_MODE = os.getenv('DRIVE_MONITOR_MODE', 'poll')
+DRIVE_PAGE_TOKEN_FILE = os.getenv('DRIVE_PAGE_TOKEN_FILE', 'drive_page_token.txt')
+
+# Optional push notifications for changes mode
+DRIVE_WEBHOOK_ADDRESS = os.getenv('DRIVE_WEBHOOK_ADDRESS')
+DRIVE_WEBHOOK_PORT = int(os.getenv('DRIVE_WEBHOOK_PORT', 8080))
+DRIVE_WEBHOOK_TOKEN = os.getenv('DRIVE_WEBHOOK_TOKEN')
+DRIVE_WATCH_TTL = int(os.getenv('DRIVE_WATCH_TTL', 3600))
+
+# Sheets write buffering
+SHEETS_BUFFERED = os.getenv('SHEETS_BUFFERED', 'false').lower() == 'true'
+SHEETS_BATCH_SIZE = int(os.getenv('SHEETS_BATCH_SIZE', 100))
+SHEETS_FLUSH_INTERVAL = int(os.getenv('SHEETS_FLUSH_INTERVAL', 10))
+
+# Concurrent processing pipeline
+PIPELINE_ENABLED = os.getenv('PIPELINE_ENABLED', 'false').lower() == 'true'
+DOWNLOAD_WORKERS = int(os.getenv('DOWNLOAD_WORKERS', 4))
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', os.cpu_count() or 1))
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 32))
+
+# Isolated extraction: parse each PDF in a child process with wall-time, CPU and memory limits (Unix only)
+ISOLATED_EXTRACTION = os.getenv('ISOLATED_EXTRACTION', 'false').lower() == 'true'
+EXTRACT_TIMEOUT = int(os.getenv('EXTRACT_TIMEOUT', 60))
+EXTRACT_CPU_SECONDS = int(os.getenv('EXTRACT_CPU_SECONDS', 30))
+EXTRACT_MAX_MEMORY_MB = int(os.getenv('EXTRACT_MAX_MEMORY_MB', 1024))
+EXTRACT_MAX_PAGES = int(os.getenv('EXTRACT_MAX_PAGES', 50))
+EXTRACT_RECYCLE_AFTER = int(os.getenv('EXTRACT_RECYCLE_AFTER', 200))
+
+# Offline batch import (batch.py)
+BATCH_CHUNKSIZE = int(os.getenv('BATCH_CHUNKSIZE', 16))
+BATCH_WRITE_ROWS = int(os.getenv('BATCH_WRITE_ROWS', 1000))
+BATCH_UPLOAD_ROWS = int(os.getenv('BATCH_UPLOAD_ROWS', 10000))
+
+# API client for pipeline downloads: 'sync' (googleapiclient per thread) or 'async' (aiohttp)
+API_CLIENT = os.getenv('API_CLIENT', 'sync')
+ASYNC_MAX_CONCURRENCY = int(os.getenv('ASYNC_MAX_CONCURRENCY', 16))
+ASYNC_REQUEST_TIMEOUT = int(os.getenv('ASYNC_REQUEST_TIMEOUT', 120))
+
+# API quotas and retries (requests per minute, shared by every thread in the process)
+DRIVE_READS_PER_MINUTE = int(os.getenv('DRIVE_READS_PER_MINUTE', 12000))
+DRIVE_WRITES_PER_MINUTE = int(os.getenv('DRIVE_WRITES_PER_MINUTE', 3000))
+SHEETS_READS_PER_MINUTE = int(os.getenv('SHEETS_READS_PER_MINUTE', 60))
+SHEETS_WRITES_PER_MINUTE = int(os.getenv('SHEETS_WRITES_PER_MINUTE', 60))
+API_MAX_RETRIES = int(os.getenv('API_MAX_RETRIES', 5))
+API_BASE_BACKOFF = float(os.getenv('API_BASE_BACKOFF', 1.0))
+API_MAX_BACKOFF = float(os.getenv('API_MAX_BACKOFF', 64))
+
+# Metrics: Prometheus text endpoint on localhost (0 disables), JSON log lines, sampled cProfile of PDFExtractor
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+METRICS_JSON_LOGS = os.getenv('METRICS_JSON_LOGS', 'false').lower() == 'true'
+METRICS_LOG_INTERVAL = int(os.getenv('METRICS_LOG_INTERVAL', 60))
+PROFILE_EXTRACTOR = os.getenv('PROFILE_EXTRACTOR', 'false').lower() == 'true'
+PROFILE_EVERY = int(os.getenv('PROFILE_EVERY', 20))
+PROFILE_FILE = os.getenv('PROFILE_FILE', 'extractor.prof')
+
+# Local state
+DUPLICATE_INDEX_FILE = os.getenv('DUPLICATE_INDEX_FILE', 'duplicate_index.db')
+RESULT_CACHE_FILE = os.getenv('RESULT_CACHE_FILE', 'result_cache.db')
+RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+JOB_QUEUE_FILE = os.getenv('JOB_QUEUE_FILE', 'job_queue.db')
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 5))
+JOB_RETRY_DELAY = int(os.getenv('JOB_RETRY_DELAY', 60))
 
 # Google API Scopes
 SCOPES = [
@@ -1,41 +1,313 @@
+import hashlib
+import os
+import tempfile
 import time
-from datetime import datetime
-from google_auth import get_google_service
+import uuid
+from datetime import datetime, timezone
+from googleapiclient.http import MediaIoBaseDownload
+from google_auth import LazyService
+from rate_limiter import get_rate_limiter
+from drive_webhook import ChangeWebhook
+import metrics
 import config
 
+CHANGE_FIELDS = "nextPageToken, newStartPageToken, changes(fileId, removed, file(id, name, mimeType, modifiedTime, size, md5Checksum, parents, trashed))"
+
+def exceeds_download_limit(size):
+    """Check a size against MAX_DOWNLOAD_BYTES; such files can never be downloaded"""
+    return bool(config.MAX_DOWNLOAD_BYTES and size) and int(size) > config.MAX_DOWNLOAD_BYTES
+
 class DriveMonitor:
-    def __init__(self):
-        self.drive_service = get_google_service('drive', 'v3')
-        self.last_check = datetime.now().isoformat()
+    source = 'Google Drive'
+    
+    def __init__(self, mode=None, drive_service=None, folder_ids=None):
+        self.drive_service = drive_service or LazyService('drive', 'v3')
+        self.folder_ids = list(folder_ids or [config.DRIVE_FOLDER_ID])
+        self.limiter = get_rate_limiter()
+        self.mode = mode or config.DRIVE_MONITOR_MODE
+        self.last_check = self.utc_now()
+        
+        # Changes API cursor and optional push channel
+        self.page_token = None
+        self.webhook = None
+        self.channel = None
+        
+        # Backfill listing progress
+        self.files_listed = 0
+    
+    def utc_now(self):
+        return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    
+    def parent_queries(self, folder_ids=None):
+        """Query clauses matching files in any of the folders, a batch of folders per query"""
+        folder_ids = folder_ids or self.folder_ids
+        queries = []
+        for start in range(0, len(folder_ids), config.DRIVE_QUERY_FOLDERS):
+            batch = folder_ids[start:start + config.DRIVE_QUERY_FOLDERS]
+            queries.append('(' + ' or '.join(f"'{folder_id}' in parents" for folder_id in batch) + ')')
+        return queries
     
     def get_new_files(self):
-        """Get new PDF files from Drive folder"""
+        """Get new PDF files from the Drive folders"""
+        if self.mode == 'changes':
+            return self.get_changed_files()
+        
         try:
-            query = f"'{config.DRIVE_FOLDER_ID}' in parents and mimeType='application/pdf' and modifiedTime > '{self.last_check}'"
+            check_time = self.utc_now()
+            files = []
+            for parents in self.parent_queries():
+                query = f"{parents} and mimeType='application/pdf' and modifiedTime > '{self.last_check}'"
+                token = None
+                while True:
+                    with metrics.timer('list'):
+                        results = self.limiter.execute('drive', 'read', self.drive_service.files().list(
+                            q=query,
+                            pageSize=config.LIST_PAGE_SIZE,
+                            pageToken=token,
+                            fields="nextPageToken, files(id, name, modifiedTime, size, md5Checksum, parents)"
+                        ))
+                    files.extend(results.get('files', []))
+                    token = results.get('nextPageToken')
+                    if not token:
+                        break
             
-            results = self.drive_service.files().list(
-                q=query,
-                fields="files(id, name, modifiedTime, size)"
-            ).execute()
-            
-            files = results.get('files', [])
-            self.last_check = datetime.now().isoformat()
+            self.last_check = check_time
             
             return files
         except Exception as e:
             print(f"Error checking for new files: {e}")
             return []
     
-    def download_file(self, file_id, filename):
-        """Download PDF file from Drive"""
+    def listing_key(self, folder_ids=None):
+        """Short key identifying a set of folders, for state that only applies to that set"""
+        return hashlib.md5('|'.join(self.parent_queries(folder_ids)).encode('utf-8')).hexdigest()[:12]
+    
+    def iter_folder_files(self, resume=True, folder_ids=None):
+        """Yield every PDF in the folders, following all result pages"""
+        queries = self.parent_queries(folder_ids)
+        key = self.listing_key(folder_ids)
+        index, token = self.load_backfill_checkpoint(key) if resume else (0, None)
+        self.files_listed = 0
+        
+        while index < len(queries):
+            query = f"{queries[index]} and mimeType='application/pdf'"
+            try:
+                with metrics.timer('list'):
+                    results = self.limiter.execute('drive', 'read', self.drive_service.files().list(
+                        q=query,
+                        pageSize=config.LIST_PAGE_SIZE,
+                        pageToken=token,
+                        fields="nextPageToken, files(id, name, modifiedTime, size, md5Checksum, parents)"
+                    ))
+            except Exception as e:
+                if not token:
+                    raise
+                # Saved page tokens can go stale; start this query over
+                print(f"Backfill checkpoint no longer valid, restarting listing: {e}")
+                token = None
+                self.clear_backfill_checkpoint()
+                continue
+            
+            # Checkpoint the page before handing out its files, so an
+            # interrupted backfill re-lists this page and skips what was done
+            if token:
+                self.save_backfill_checkpoint(key, index, token)
+            
+            files = results.get('files', [])
+            self.files_listed += len(files)
+            yield from files
+            
+            token = results.get('nextPageToken')
+            if not token:
+                index += 1
+                if index < len(queries):
+                    self.save_backfill_checkpoint(key, index, '')
+        
+        self.clear_backfill_checkpoint()
+    
+    def load_backfill_checkpoint(self, key):
+        """Return the saved (query index, page token) for this listing, or where to start afresh"""
+        if os.path.exists(config.BACKFILL_CHECKPOINT_FILE):
+            with open(config.BACKFILL_CHECKPOINT_FILE) as f:
+                saved = f.read().strip().split(':')
+            # The checkpoint only applies to the same set of folders
+            if len(saved) == 3 and saved[0] == key:
+                print("Resuming backfill from saved checkpoint")
+                return int(saved[1]), saved[2] or None
+        return 0, None
+    
+    def save_backfill_checkpoint(self, key, index, token):
+        with open(config.BACKFILL_CHECKPOINT_FILE, 'w') as f:
+            f.write(f"{key}:{index}:{token}")
+    
+    def clear_backfill_checkpoint(self):
+        if os.path.exists(config.BACKFILL_CHECKPOINT_FILE):
+            os.remove(config.BACKFILL_CHECKPOINT_FILE)
+    
+    def load_page_token(self):
+        """Load the saved changes cursor, or start one from now"""
+        if self.page_token:
+            return self.page_token
+        
+        if os.path.exists(config.DRIVE_PAGE_TOKEN_FILE):
+            with open(config.DRIVE_PAGE_TOKEN_FILE) as f:
+                self.page_token = f.read().strip() or None
+        
+        if not self.page_token:
+            response = self.limiter.execute('drive', 'read', self.drive_service.changes().getStartPageToken())
+            self.save_page_token(response['startPageToken'])
+        
+        return self.page_token
+    
+    def save_page_token(self, token):
+        self.page_token = token
+        with open(config.DRIVE_PAGE_TOKEN_FILE, 'w') as f:
+            f.write(token)
+    
+    def get_changed_files(self):
+        """Get PDF files in the folder changed since the saved cursor"""
+        try:
+            token = self.load_page_token()
+            files = {}
+            
+            while token:
+                with metrics.timer('list'):
+                    results = self.limiter.execute('drive', 'read', self.drive_service.changes().list(
+                        pageToken=token,
+                        pageSize=1000,
+                        spaces='drive',
+                        fields=CHANGE_FIELDS
+                    ))
+                
+                for change in results.get('changes', []):
+                    file_info = change.get('file')
+                    if change.get('removed') or not file_info or file_info.get('trashed'):
+                        continue
+                    if file_info.get('mimeType') != 'application/pdf':
+                        continue
+                    if not set(self.folder_ids) & set(file_info.get('parents', [])):
+                        continue
+                    files[file_info['id']] = file_info
+                
+                if 'newStartPageToken' in results:
+                    self.save_page_token(results['newStartPageToken'])
+                    break
+                token = results.get('nextPageToken')
+            
+            return list(files.values())
+        except Exception as e:
+            print(f"Error checking for changes: {e}")
+            return []
+    
+    def watch_changes(self, address, port):
+        """Register a changes.watch channel and start the local receiver"""
+        try:
+            if not self.webhook:
+                self.webhook = ChangeWebhook(port, token=config.DRIVE_WEBHOOK_TOKEN)
+                self.webhook.start()
+            
+            body = {
+                'id': str(uuid.uuid4()),
+                'type': 'web_hook',
+                'address': address,
+                'expiration': int((time.time() + self.watch_ttl()) * 1000)
+            }
+            if config.DRIVE_WEBHOOK_TOKEN:
+                body['token'] = config.DRIVE_WEBHOOK_TOKEN
+            
+            previous = self.channel
+            self.channel = self.limiter.execute('drive', 'write', self.drive_service.changes().watch(
+                pageToken=self.load_page_token(),
+                body=body
+            ))
+            # Until it expires, the replaced channel would send every notification a second time
+            if previous:
+                self.stop_channel(previous)
+            print(f"Watching Drive changes via {address}")
+            return True
+        except Exception as e:
+            print(f"Error starting Drive change watch: {e}")
+            return False
+    
+    def watch_ttl(self):
+        """Channel lifetime, raised when needed so a channel outlives its renewal margin"""
+        margin = self.renewal_margin()
+        if config.DRIVE_WATCH_TTL > margin * 2:
+            return config.DRIVE_WATCH_TTL
+        print(f"DRIVE_WATCH_TTL of {config.DRIVE_WATCH_TTL}s is within the {margin:g}s renewal margin, "
+              f"using {margin * 2:g}s")
+        return margin * 2
+    
+    def renewal_margin(self, timeout=0):
+        """Renew the channel this many seconds before it expires: two of the longest waits between polls"""
+        return max(timeout, config.POLL_INTERVAL, config.POLL_MAX_INTERVAL) * 2
+    
+    def stop_channel(self, channel):
+        try:
+            self.limiter.execute('drive', 'write', self.drive_service.channels().stop(body={
+                'id': channel['id'],
+                'resourceId': channel['resourceId']
+            }))
+        except Exception as e:
+            print(f"Error stopping Drive change watch: {e}")
+    
+    def stop_watch(self):
+        """Stop the push channel and local receiver"""
+        if self.channel:
+            self.stop_channel(self.channel)
+        self.channel = None
+        if self.webhook:
+            self.webhook.stop()
+            self.webhook = None
+    
+    def wait_for_changes(self, timeout):
+        """Sleep until the next poll, waking early on a push notification"""
+        if not self.webhook:
+            time.sleep(timeout)
+            return
+        
+        # Renew the channel shortly before Drive expires it, even when this wait is short
+        expiration = int(self.channel.get('expiration', 0)) / 1000 if self.channel else 0
+        if expiration - time.time() < self.renewal_margin(timeout):
+            self.watch_changes(config.DRIVE_WEBHOOK_ADDRESS, self.webhook.port)
+        
+        self.webhook.wait(timeout)
+    
+    def download_stream(self, file_id, filename, size=None):
+        """Download PDF file from Drive into a memory buffer, in chunks"""
+        if exceeds_download_limit(size):
+            print(f"Skipping {filename}: {int(size)} bytes exceeds download limit")
+            return None
+        
+        # Small files stay in memory; larger ones spill to an anonymous temp file
+        buffer = tempfile.SpooledTemporaryFile(max_size=config.DOWNLOAD_SPOOL_BYTES)
+        start = time.perf_counter()
         try:
             request = self.drive_service.files().get_media(fileId=file_id)
+            downloader = MediaIoBaseDownload(buffer, request, chunksize=config.DOWNLOAD_CHUNK_SIZE)
             
-            with open(f"temp_{filename}", 'wb') as f:
-                downloader = request.execute()
-                f.write(downloader)
+            done = False
+            while not done:
+                _, done = self.limiter.call('drive', 'read', downloader.next_chunk)
+                if exceeds_download_limit(buffer.tell()):
+                    print(f"Skipping {filename}: download exceeds limit")
+                    buffer.close()
+                    return None
             
-            return f"temp_{filename}"
+            metrics.observe_stage('download', time.perf_counter() - start)
+            metrics.inc('cv_downloaded_bytes_total', buffer.tell())
+            buffer.seek(0)
+            return buffer
         except Exception as e:
+            buffer.close()
             print(f"Error downloading file {filename}: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def download_bytes(self, file_id, filename, size=None):
+        """Download PDF file from Drive as bytes, for handing to another process"""
+        # The whole file is held in memory here, however large DOWNLOAD_SPOOL_BYTES lets the spool grow
+        stream = self.download_stream(file_id, filename, size)
+        if stream is None:
+            return None
+        with stream:
+            return stream.read()
@@ -0,0 +1,51 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class ChangeWebhook:
+    """Receives Drive changes.watch notifications and wakes the poller"""
+    
+    def __init__(self, port, token=None):
+        self.port = port
+        self.token = token
+        self.changed = threading.Event()
+        self.server = None
+    
+    def start(self):
+        webhook = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                if length:
+                    self.rfile.read(length)
+                
+                if webhook.token and self.headers.get('X-Goog-Channel-Token') != webhook.token:
+                    self.send_response(403)
+                    self.end_headers()
+                    return
+                
+                # 'sync' is sent once when the channel is created
+                if self.headers.get('X-Goog-Resource-State') != 'sync':
+                    webhook.changed.set()
+                
+                self.send_response(200)
+                self.end_headers()
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer(('', self.port), Handler)
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        print(f"Listening for Drive change notifications on port {self.port}")
+    
+    def wait(self, timeout):
+        """Wait until a notification arrives or timeout passes"""
+        notified = self.changed.wait(timeout)
+        self.changed.clear()
+        return notified
+    
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server = None
@@ -0,0 +1,106 @@
+import sqlite3
+import threading
+import config
+
+class DuplicateIndex:
+    def __init__(self, path=None):
+        self.path = path or config.DUPLICATE_INDEX_FILE
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "filename TEXT, file_id TEXT, content_hash TEXT, row INTEGER, revision TEXT)"
+        )
+        # Indexes created before rows were keyed by file ID
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(entries)")}
+        for column, kind in (('row', 'INTEGER'), ('revision', 'TEXT')):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE entries ADD COLUMN {column} {kind}")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_filename ON entries(filename)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_file_id ON entries(file_id)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_content_hash ON entries(content_hash)")
+        self.conn.commit()
+    
+    def contains(self, filename=None, file_id=None, content_hash=None, revision=None):
+        """Check if this file, or another copy of it, is already in the sheet at this revision"""
+        with self.lock:
+            if file_id:
+                row = self.conn.execute(
+                    "SELECT revision FROM entries WHERE file_id = ? LIMIT 1", (file_id,)
+                ).fetchone()
+                if row:
+                    # Rows written before revisions were tracked are never updated
+                    return row[0] is None or revision is None or row[0] == revision
+            
+            if content_hash and self.conn.execute(
+                "SELECT 1 FROM entries WHERE content_hash = ? LIMIT 1", (content_hash,)
+            ).fetchone():
+                return True
+            
+            # A bare filename only identifies rows that have no file ID
+            if filename:
+                query = "SELECT 1 FROM entries WHERE filename = ?"
+                if file_id:
+                    query += " AND file_id IS NULL"
+                return self.conn.execute(query + " LIMIT 1", (filename,)).fetchone() is not None
+        return False
+    
+    def add(self, filename, file_id=None, content_hash=None, row=None, revision=None):
+        """Record a row that was written to the sheet, replacing an older revision of the file"""
+        with self.lock:
+            updated = 0
+            if file_id:
+                updated = self.conn.execute(
+                    "UPDATE entries SET filename = ?, content_hash = ?, row = COALESCE(?, row), revision = ? "
+                    "WHERE file_id = ?",
+                    (filename, content_hash, row, revision, file_id)
+                ).rowcount
+            if not updated:
+                self.conn.execute(
+                    "INSERT INTO entries (filename, file_id, content_hash, row, revision) VALUES (?, ?, ?, ?, ?)",
+                    (filename, file_id, content_hash, row, revision)
+                )
+            self.conn.commit()
+    
+    def row_for(self, file_id):
+        """Sheet row number of a file, or None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT row FROM entries WHERE file_id = ? AND row IS NOT NULL LIMIT 1", (file_id,)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def content_hash_for(self, file_id):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT content_hash FROM entries WHERE file_id = ? LIMIT 1", (file_id,)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def count(self):
+        """Number of indexed rows"""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+    
+    def reconcile(self, sheet_rows):
+        """Rebuild the index from (row, filename, file_id, revision) tuples read from the sheet"""
+        with self.lock:
+            existing = self.conn.execute("SELECT filename, file_id, content_hash FROM entries").fetchall()
+            hashes = {file_id: content_hash for _, file_id, content_hash in existing if file_id}
+            indexed = {file_id or filename for filename, file_id, _ in existing}
+            in_sheet = {file_id or filename for _, filename, file_id, _ in sheet_rows}
+            
+            # Content hashes are not in the sheet, so carry them over by file ID
+            self.conn.execute("DELETE FROM entries")
+            self.conn.executemany(
+                "INSERT INTO entries (filename, file_id, content_hash, row, revision) VALUES (?, ?, ?, ?, ?)",
+                [(filename, file_id or None, hashes.get(file_id), row, revision or None)
+                 for row, filename, file_id, revision in sheet_rows]
+            )
+            self.conn.commit()
+        
+        return len(in_sheet - indexed), len(indexed - in_sheet)
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -1,18 +1,76 @@
+from google.auth.credentials import AnonymousCredentials
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 import os
+import threading
 import config
 
-def get_google_service(service_name, version):
-    """Authenticate and return Google API service using service account"""
+API_ENDPOINTS = {
+    'drive': config.DRIVE_API_ENDPOINT,
+    'sheets': config.SHEETS_API_ENDPOINT
+}
+
+# Credentials are shared process-wide so the access token is fetched once;
+# API clients sit on an httplib2 connection that is not thread-safe, so
+# each thread gets its own
+_lock = threading.Lock()
+_credentials = {}
+_services = threading.local()
+
+def get_credentials(service_name=None):
+    """Load service account credentials, once per process"""
+    # A local fake API server does not need real credentials
+    anonymous = bool(API_ENDPOINTS.get(service_name)) and not os.path.exists(config.GOOGLE_CREDENTIALS_FILE)
+    
+    with _lock:
+        if anonymous not in _credentials:
+            _credentials[anonymous] = AnonymousCredentials() if anonymous else load_credentials()
+        return _credentials[anonymous]
+
+def load_credentials():
     if not os.path.exists(config.GOOGLE_CREDENTIALS_FILE):
         print(f"Error: {config.GOOGLE_CREDENTIALS_FILE} not found!")
         exit(1)
     
     try:
-        creds = service_account.Credentials.from_service_account_file(
+        return service_account.Credentials.from_service_account_file(
             config.GOOGLE_CREDENTIALS_FILE, scopes=config.SCOPES)
-        return build(service_name, version, credentials=creds)
     except Exception as e:
         print(f"Error loading credentials: {e}")
-        exit(1)
\ No newline at end of file
+        exit(1)
+
+def get_google_service(service_name, version):
+    """Return this thread's Google API client, building it on first use"""
+    services = getattr(_services, 'clients', None)
+    if services is None:
+        services = _services.clients = {}
+    
+    key = (service_name, version)
+    if key not in services:
+        services[key] = build_service(service_name, version)
+    return services[key]
+
+def build_service(service_name, version):
+    """Authenticate and build a Google API client using service account"""
+    endpoint = API_ENDPOINTS.get(service_name)
+    client_options = {'api_endpoint': endpoint} if endpoint else None
+    creds = get_credentials(service_name)
+
+    try:
+        # Discovery documents bundled with the client library; no network fetch
+        return build(service_name, version, credentials=creds, client_options=client_options,
+                     static_discovery=True, cache_discovery=False)
+    except Exception as e:
+        print(f"Error building {service_name} service: {e}")
+        exit(1)
+
+class LazyService:
+    """Stands in for a Google API client until a request is made"""
+    
+    def __init__(self, service_name, version):
+        self.service_name = service_name
+        self.version = version
+    
+    def __getattr__(self, attr):
+        # Resolved per call, so every thread uses its own client
+        return getattr(get_google_service(self.service_name, self.version), attr)
@@ -0,0 +1,168 @@
+import multiprocessing
+import queue
+import signal
+import threading
+from concurrent.futures import Future
+import metrics
+import config
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+class ExtractionLimitError(Exception):
+    """A document ran past its wall-time, CPU or memory allowance"""
+
+def page_cap():
+    """Pages an isolated worker may read, even when PDF_MAX_PAGES is 0 (no limit)"""
+    return min(config.PDF_MAX_PAGES or config.EXTRACT_MAX_PAGES, config.EXTRACT_MAX_PAGES)
+
+def virtual_memory_bytes():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmSize:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+def limit_memory():
+    """Cap how far this process's address space may grow from here"""
+    # A forked worker inherits the parent's mappings, so the cap is relative
+    limit = virtual_memory_bytes() + config.EXTRACT_MAX_MEMORY_MB * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, resource.getrlimit(resource.RLIMIT_AS)[1]))
+
+def limit_cpu():
+    """Allow the next document EXTRACT_CPU_SECONDS on top of the CPU time used so far"""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime) + config.EXTRACT_CPU_SECONDS
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, resource.getrlimit(resource.RLIMIT_CPU)[1]))
+
+def worker_main(conn, metrics_queue):
+    """Run tasks sent by the parent until told to stop; SIGXCPU ends the process on a CPU breach"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C is handled by the parent
+    metrics.init_worker(metrics_queue)
+    limit_memory()
+    
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        
+        func, args = task
+        limit_cpu()
+        try:
+            conn.send((True, func(*args)))
+        except MemoryError:
+            # The heap is in an unknown state; the parent starts a fresh worker
+            conn.send((False, ExtractionLimitError("memory limit exceeded")))
+            break
+        except Exception as e:
+            conn.send((False, e))
+    conn.close()
+
+class IsolatedPool:
+    """Executor-style pool of extraction processes with per-document limits"""
+    
+    def __init__(self, workers=None, metrics_queue=None):
+        if resource is None:
+            raise RuntimeError("Isolated extraction needs the resource module, which is only available on Unix")
+        
+        self.workers = workers or config.PARSE_WORKERS
+        self.own_metrics_queue = metrics_queue is None
+        self.metrics_queue = metrics_queue or metrics.start_collector()
+        self.tasks = queue.Queue()
+        self.threads = [threading.Thread(target=self.run_slot, daemon=True) for _ in range(self.workers)]
+        for thread in self.threads:
+            thread.start()
+    
+    def submit(self, func, *args):
+        """Queue func(*args) for a worker process; func must be importable by name"""
+        future = Future()
+        self.tasks.put((future, func, args))
+        return future
+    
+    def start_worker(self):
+        parent_conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=worker_main, args=(child_conn, self.metrics_queue), daemon=True)
+        process.start()
+        child_conn.close()
+        return process, parent_conn
+    
+    def stop_worker(self, process, conn):
+        if process.is_alive():
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+            process.join(1)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        conn.close()
+    
+    def run_slot(self):
+        """Feed one worker process at a time from the shared task queue"""
+        process = conn = None
+        handled = 0
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+            future, func, args = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            
+            if process is not None and not process.is_alive():
+                self.stop_worker(process, conn)
+                metrics.inc('cv_extract_worker_restarts_total', reason='crashed')
+                process = None
+            if process is None:
+                process, conn = self.start_worker()
+                handled = 0
+            
+            failure = None
+            try:
+                conn.send((func, args))
+                if conn.poll(config.EXTRACT_TIMEOUT):
+                    ok, value = conn.recv()
+                    if ok:
+                        future.set_result(value)
+                    else:
+                        future.set_exception(value)
+                        if isinstance(value, ExtractionLimitError):
+                            failure = 'memory'
+                else:
+                    failure = 'timeout'
+                    process.kill()
+                    future.set_exception(ExtractionLimitError(f"timed out after {config.EXTRACT_TIMEOUT}s"))
+            except (EOFError, OSError):
+                process.join()
+                failure = 'cpu' if process.exitcode == -signal.SIGXCPU else 'crashed'
+                message = "CPU limit exceeded" if failure == 'cpu' else f"worker exited with code {process.exitcode}"
+                future.set_exception(ExtractionLimitError(message))
+            
+            # A worker that breached a limit fails only its own document and is
+            # replaced; healthy workers are replaced after EXTRACT_RECYCLE_AFTER
+            # documents so parser memory growth cannot build up
+            handled += 1
+            if failure:
+                metrics.inc('cv_extract_limits_total', limit=failure)
+            if failure or handled >= config.EXTRACT_RECYCLE_AFTER:
+                self.stop_worker(process, conn)
+                metrics.inc('cv_extract_worker_restarts_total', reason=failure or 'recycled')
+                process = None
+        
+        if process is not None:
+            self.stop_worker(process, conn)
+    
+    def shutdown(self, wait=True):
+        for _ in self.threads:
+            self.tasks.put(None)
+        if wait:
+            for thread in self.threads:
+                thread.join()
+        if self.own_metrics_queue:
+            self.metrics_queue.put(None)
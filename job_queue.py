@@ -0,0 +1,140 @@
+import sqlite3
+import threading
+import time
+import config
+
+# Job lifecycle: discovered -> downloaded -> extracted -> written, or failed once retries run out
+DISCOVERED = 'discovered'
+DOWNLOADED = 'downloaded'
+EXTRACTED = 'extracted'
+WRITTEN = 'written'
+FAILED = 'failed'
+
+class JobQueue:
+    """Persistent per-file job state so a restart resumes only unfinished work"""
+    
+    def __init__(self, path=None, max_attempts=None, retry_delay=None):
+        self.path = path or config.JOB_QUEUE_FILE
+        self.max_attempts = max_attempts or config.JOB_MAX_ATTEMPTS
+        self.retry_delay = config.JOB_RETRY_DELAY if retry_delay is None else retry_delay
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        
+        # WAL keeps readers off the writer's lock and survives a crash mid-commit
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "file_id TEXT PRIMARY KEY, filename TEXT, content_hash TEXT, size TEXT, modified_time TEXT, "
+            "state TEXT, attempts INTEGER DEFAULT 0, next_attempt REAL DEFAULT 0, last_error TEXT, updated REAL, "
+            "route TEXT)"
+        )
+        # Queues created before routes were added
+        if 'route' not in {row[1] for row in self.conn.execute("PRAGMA table_info(jobs)")}:
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN route TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_state ON jobs(state, next_attempt)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+    
+    def enqueue(self, file_info):
+        """Record a discovered Drive file; returns False if this revision is already tracked"""
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO jobs (file_id, filename, content_hash, size, modified_time, state, updated, route) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (file_info['id'], file_info['name'], file_info.get('md5Checksum'), file_info.get('size'),
+                 file_info.get('modifiedTime'), DISCOVERED, time.time(), file_info.get('route'))
+            )
+            if cursor.rowcount == 0 and file_info.get('modifiedTime'):
+                # A re-uploaded file keeps its ID; its new revision goes through again
+                cursor = self.conn.execute(
+                    "UPDATE jobs SET filename = ?, content_hash = ?, size = ?, modified_time = ?, state = ?, "
+                    "attempts = 0, next_attempt = 0, last_error = NULL, updated = ? "
+                    "WHERE file_id = ? AND modified_time IS NOT ?",
+                    (file_info['name'], file_info.get('md5Checksum'), file_info.get('size'),
+                     file_info['modifiedTime'], DISCOVERED, time.time(), file_info['id'], file_info['modifiedTime'])
+                )
+            self.conn.commit()
+            return cursor.rowcount > 0
+    
+    def track(self, files):
+        """Enqueue files as they stream in and yield the ones not seen before"""
+        for file_info in files:
+            if self.enqueue(file_info):
+                yield file_info
+    
+    def mark(self, file_id, state):
+        """Advance a job to a new state"""
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, last_error = NULL, updated = ? WHERE file_id = ?",
+                (state, time.time(), file_id)
+            )
+            self.conn.commit()
+    
+    def fail(self, file_id, error, retry=True):
+        """Record a failed attempt; dead-letters the job after max_attempts, or at once if retry is False"""
+        with self.lock:
+            row = self.conn.execute("SELECT attempts FROM jobs WHERE file_id = ?", (file_id,)).fetchone()
+            if row is None:
+                return
+            
+            attempts = row[0] + 1
+            now = time.time()
+            if not retry or attempts >= self.max_attempts:
+                self.conn.execute(
+                    "UPDATE jobs SET state = ?, attempts = ?, last_error = ?, updated = ? WHERE file_id = ?",
+                    (FAILED, attempts, error, now, file_id)
+                )
+                print(f"Giving up on {file_id} after {attempts} attempts: {error}")
+            else:
+                # Keep the state reached so far and retry later with exponential backoff
+                self.conn.execute(
+                    "UPDATE jobs SET attempts = ?, next_attempt = ?, last_error = ?, updated = ? WHERE file_id = ?",
+                    (attempts, now + self.retry_delay * 2 ** (attempts - 1), error, now, file_id)
+                )
+            self.conn.commit()
+    
+    def pending(self):
+        """Unfinished jobs that are due, as Drive file records"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT file_id, filename, content_hash, size, modified_time, route FROM jobs "
+                "WHERE state NOT IN (?, ?) AND next_attempt <= ? ORDER BY updated",
+                (WRITTEN, FAILED, time.time())
+            ).fetchall()
+        
+        return [
+            {'id': file_id, 'name': filename, 'md5Checksum': content_hash, 'size': size, 'modifiedTime': modified,
+             'route': route}
+            for file_id, filename, content_hash, size, modified, route in rows
+        ]
+    
+    def counts(self):
+        """Number of jobs in each state"""
+        with self.lock:
+            return dict(self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+    
+    def retry_failed(self):
+        """Move dead-lettered jobs back into the queue"""
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET state = ?, attempts = 0, next_attempt = 0, updated = ? WHERE state = ?",
+                (DISCOVERED, time.time(), FAILED)
+            )
+            self.conn.commit()
+            return cursor.rowcount
+    
+    def get_meta(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else None
+    
+    def set_meta(self, key, value):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+            self.conn.commit()
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
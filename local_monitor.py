@@ -0,0 +1,204 @@
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timezone
+import config
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+class LocalFolderMonitor:
+    """Watches WATCH_FOLDER for PDFs with inotify events; same interface as DriveMonitor"""
+    
+    source = 'Local Folder'
+    
+    def __init__(self, folder=None, debounce=None):
+        self.folder = os.path.abspath(folder or config.WATCH_FOLDER)
+        self.debounce = config.LOCAL_DEBOUNCE_SECONDS if debounce is None else debounce
+        self.mode = 'local'
+        self.last_check = self.utc_now()
+        self.files_listed = 0
+        
+        # Paths with recent events: path -> (time of last event, size seen then)
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.changed = threading.Event()
+        self.observer = None
+        self.scanned = False
+    
+    def utc_now(self):
+        return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    
+    def modified_time(self, path):
+        return datetime.fromtimestamp(os.path.getmtime(path), timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    
+    def is_pdf(self, path):
+        return path.lower().endswith('.pdf') and not os.path.basename(path).startswith('.')
+    
+    def file_info(self, path):
+        """Describe a local file the way Drive describes one"""
+        md5 = hashlib.md5()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(config.DOWNLOAD_CHUNK_SIZE), b''):
+                md5.update(chunk)
+        
+        return {
+            'id': path,
+            'name': os.path.basename(path),
+            'size': str(os.path.getsize(path)),
+            'modifiedTime': self.modified_time(path),
+            'md5Checksum': md5.hexdigest(),
+        }
+    
+    def list_pdfs(self):
+        if not os.path.isdir(self.folder):
+            print(f"Watch folder not found: {self.folder}")
+            return []
+        return sorted(entry.path for entry in os.scandir(self.folder) if entry.is_file() and self.is_pdf(entry.path))
+    
+    def listing_key(self):
+        """Short key identifying the watched folder, distinct from any Drive folder set"""
+        return hashlib.md5(f"local:{self.folder}".encode('utf-8')).hexdigest()[:12]
+    
+    def iter_folder_files(self, resume=True):
+        """Yield every PDF currently in the folder"""
+        self.files_listed = 0
+        for path in self.list_pdfs():
+            try:
+                info = self.file_info(path)
+            except OSError as e:
+                print(f"Error reading {path}: {e}")
+                continue
+            self.files_listed += 1
+            yield info
+    
+    def get_new_files(self):
+        """Return PDFs whose writes have settled since the last call"""
+        try:
+            check_time = self.utc_now()
+            
+            # Files dropped while the watcher was not running have no events
+            if not self.scanned:
+                for path in self.list_pdfs():
+                    if self.modified_time(path) > self.last_check:
+                        self.note_event(path)
+                self.scanned = True
+            
+            ready = []
+            now = time.time()
+            with self.lock:
+                for path, (seen, size) in list(self.pending.items()):
+                    if not os.path.exists(path):
+                        del self.pending[path]
+                        continue
+                    if now - seen < self.debounce:
+                        continue
+                    
+                    # Still growing: an upload in progress without a fresh event
+                    current = os.path.getsize(path)
+                    if current != size:
+                        self.pending[path] = (now, current)
+                        continue
+                    
+                    del self.pending[path]
+                    ready.append(path)
+            
+            files = []
+            for path in ready:
+                try:
+                    files.append(self.file_info(path))
+                except OSError as e:
+                    print(f"Error reading {path}: {e}")
+            
+            self.last_check = check_time
+            return files
+        except Exception as e:
+            print(f"Error checking for new files: {e}")
+            return []
+    
+    def note_event(self, path):
+        if not self.is_pdf(path):
+            return
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        with self.lock:
+            self.pending[path] = (time.time(), size)
+        self.changed.set()
+    
+    def watch_changes(self, address=None, port=None):
+        """Start receiving filesystem events for the watch folder"""
+        if Observer is None:
+            raise RuntimeError("Local folder mode needs watchdog: pip install watchdog")
+        
+        os.makedirs(self.folder, exist_ok=True)
+        monitor = self
+        
+        class Handler(FileSystemEventHandler):
+            def on_created(self, event):
+                if not event.is_directory:
+                    monitor.note_event(event.src_path)
+            
+            def on_modified(self, event):
+                if not event.is_directory:
+                    monitor.note_event(event.src_path)
+            
+            def on_moved(self, event):
+                if not event.is_directory:
+                    monitor.note_event(event.dest_path)
+        
+        self.observer = Observer()
+        self.observer.schedule(Handler(), self.folder, recursive=False)
+        self.observer.daemon = True
+        self.observer.start()
+        print(f"Watching local folder: {self.folder}")
+    
+    def stop_watch(self):
+        if self.observer:
+            self.observer.stop()
+            self.observer.join()
+            self.observer = None
+    
+    def wait_for_changes(self, timeout):
+        """Sleep until a file event has settled or timeout passes"""
+        deadline = time.time() + timeout
+        with self.lock:
+            waiting = bool(self.pending)
+        if not waiting and not self.changed.wait(timeout):
+            return
+        self.changed.clear()
+        
+        # Return as soon as the first file's writes have gone quiet
+        while True:
+            with self.lock:
+                if not self.pending:
+                    return
+                settle_at = min(seen for seen, _ in self.pending.values()) + self.debounce
+            wait = min(settle_at, deadline) - time.time()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+    
+    def download_stream(self, file_id, filename, size=None):
+        """Open the local file in place; file_id is its path"""
+        try:
+            if config.MAX_DOWNLOAD_BYTES and os.path.getsize(file_id) > config.MAX_DOWNLOAD_BYTES:
+                print(f"Skipping {filename}: file exceeds limit")
+                return None
+            return open(file_id, 'rb')
+        except OSError as e:
+            print(f"Error opening file {filename}: {e}")
+            return None
+    
+    def download_bytes(self, file_id, filename, size=None):
+        """Read the local file as bytes, for handing to another process"""
+        stream = self.download_stream(file_id, filename, size)
+        if stream is None:
+            return None
+        with stream:
+            return stream.read()
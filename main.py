@@ -1,107 +1,329 @@
+import sys
 import time
-from drive_monitor import DriveMonitor
+from drive_monitor import DriveMonitor, exceeds_download_limit
+from local_monitor import LocalFolderMonitor
 from pdf_extractor import PDFExtractor
 from sheets_manager import SheetsManager
+from pipeline import CVPipeline, extract_worker, NEEDS_OCR
+from result_cache import ResultCache
+from async_google import AsyncClientThread
+from job_queue import JobQueue, DOWNLOADED, EXTRACTED, WRITTEN
+from ocr import OCRStage, needs_ocr
+from isolation import IsolatedPool, page_cap
+from routes import RoutedSheets, load_routes, fair_order
+from poll_scheduler import PollScheduler
+import metrics
 import config
 
 class CVProcessor:
-    def __init__(self):
-        self.drive_monitor = DriveMonitor()
+    def __init__(self, drive_service=None, sheets_service=None, drive_monitor_factory=None, routes=None):
+        # Each route sends one team's Drive folder to its own spreadsheet
+        self.routes = routes if routes is not None else (load_routes() if config.ROUTES_FILE else [])
+        if config.CV_SOURCE == 'local':
+            if self.routes:
+                raise RuntimeError("ROUTES_FILE needs CV_SOURCE=drive")
+            # Files dropped in WATCH_FOLDER are read in place, with no Drive calls
+            self.drive_monitor = LocalFolderMonitor()
+            drive_monitor_factory = LocalFolderMonitor
+        else:
+            # All route folders are polled together, a batch of folders per query
+            folder_ids = [route.folder_id for route in self.routes] or None
+            self.drive_monitor = DriveMonitor(drive_service=drive_service, folder_ids=folder_ids)
         self.pdf_extractor = PDFExtractor()
-        self.sheets_manager = SheetsManager()
+        self.result_cache = ResultCache()
+        self.job_queue = JobQueue()
+        
+        # Backfill and poll progress belong to the folders being watched, so a
+        # different folder or source kept on the same queue file starts afresh;
+        # routes track their backfills per route and share one poll time
+        self.state_key = '' if self.routes else f":{self.drive_monitor.listing_key()}"
+        self.ocr_stage = OCRStage() if config.OCR_ENABLED else None
+        
+        if config.PIPELINE_ENABLED:
+            # Pipeline writes go through a single batching stage
+            self.sheets_manager = self.make_sheets_manager(True, sheets_service)
+            use_async = config.API_CLIENT == 'async' and config.CV_SOURCE != 'local'
+            async_client = AsyncClientThread() if use_async else None
+            self.pipeline = CVPipeline(self.sheets_manager, self.result_cache,
+                                       drive_monitor_factory=drive_monitor_factory or DriveMonitor,
+                                       async_client=async_client, job_queue=self.job_queue,
+                                       ocr_stage=self.ocr_stage, source=self.drive_monitor.source)
+        else:
+            self.sheets_manager = self.make_sheets_manager(None, sheets_service)
+            self.pipeline = None
+        
+        # The pipeline isolates its own parse workers; the serial path gets one worker
+        isolate_serial = config.ISOLATED_EXTRACTION and not self.pipeline
+        self.extract_pool = IsolatedPool(1) if isolate_serial else None
+    
+    def make_sheets_manager(self, buffered, sheets_service):
+        if self.routes:
+            return RoutedSheets(self.routes, buffered=buffered, sheets_service=sheets_service, job_queue=self.job_queue)
+        return SheetsManager(buffered=buffered, sheets_service=sheets_service, job_queue=self.job_queue)
+    
+    def tag_routes(self, files):
+        """Attach each file's route, when several teams are served"""
+        return self.sheets_manager.tag(files) if self.routes else files
     
     def process_cv(self, file_info):
         """Process a single CV file"""
         filename = file_info['name']
         file_id = file_info['id']
+        content_hash = file_info.get('md5Checksum')
+        revision = file_info.get('modifiedTime')
+        start = time.perf_counter()
         
         print(f"Processing: {filename}")
         
         # Check for duplicates
-        if self.sheets_manager.check_duplicate(filename):
+        sheets_manager = self.sheets_manager.for_file(file_info)
+        if sheets_manager.check_duplicate(filename, file_id, revision=revision):
             print(f"Skipping duplicate: {filename}")
+            metrics.inc('cv_files_total', status='duplicate')
+            if not sheets_manager.is_pending(filename, file_id):
+                self.job_queue.mark(file_id, WRITTEN)
             return
         
-        # Download file
-        temp_path = self.drive_monitor.download_file(file_id, filename)
-        if not temp_path:
-            print(f"Failed to download: {filename}")
-            return
-        
-        # Extract text
-        text = self.pdf_extractor.extract_text(temp_path)
-        if not text:
-            print(f"Failed to extract text: {filename}")
+        # Same content seen before: reuse its text and skip download and parse
+        text = self.result_cache.get(content_hash)
+        if text:
+            print(f"Using cached extraction for: {filename}")
+            metrics.inc('cv_files_total', status='cached')
+            extracted_data = self.pdf_extractor.extract_fields(text, filename)
+        elif exceeds_download_limit(file_info.get('size')):
+            # The size of this revision cannot change, so retrying would only waste attempts
+            print(f"Skipping {filename}: {int(file_info['size'])} bytes exceeds download limit")
+            self.job_queue.fail(file_id, "file exceeds MAX_DOWNLOAD_BYTES", retry=False)
+            self.record_failure(filename, 'too_large')
             return
-        
-        # Extract fields
-        extracted_data = self.pdf_extractor.extract_fields(text, filename)
+        else:
+            # Download file into memory
+            stream = self.drive_monitor.download_stream(file_id, filename, file_info.get('size'))
+            if not stream:
+                print(f"Failed to download: {filename}")
+                self.job_queue.fail(file_id, "download failed")
+                self.record_failure(filename, 'download')
+                return
+            self.job_queue.mark(file_id, DOWNLOADED)
+            
+            # Extract text and fields, reading only as many pages as needed
+            with stream:
+                if self.extract_pool:
+                    text, extracted_data = self.extract_isolated(stream.read(), filename)
+                else:
+                    text, extracted_data = self.pdf_extractor.extract_text_and_fields(stream, filename)
+                
+                    # Scanned PDFs have little or no text layer; OCR runs in its own pool
+                    if self.ocr_stage and needs_ocr(text, self.pdf_extractor.pages_read):
+                        stream.seek(0)
+                        text, extracted_data = self.ocr_stage.run(stream.read(), filename) or ("", None)
+            if not text:
+                print(f"Failed to extract text: {filename}")
+                self.job_queue.fail(file_id, "extract text failed")
+                self.record_failure(filename, 'extract')
+                return
+            # Cached text lets a retry after a crash skip straight to the write
+            self.result_cache.put(content_hash, text)
+            self.job_queue.mark(file_id, EXTRACTED)
         
         # Save to sheets
-        success = self.sheets_manager.add_cv_data(extracted_data, filename)
+        success = sheets_manager.add_cv_data(extracted_data, filename, file_id, content_hash,
+                                             self.drive_monitor.source, revision)
         
         if success:
             print(f"Processed: {filename} - Status: {extracted_data['status']}")
+            metrics.inc('cv_files_total', status=extracted_data['status'])
+            metrics.log_event('cv_processed', file=filename, status=extracted_data['status'],
+                              seconds=round(time.perf_counter() - start, 4))
         else:
             print(f"Failed to save: {filename}")
+            self.job_queue.fail(file_id, "sheet write failed")
+            self.record_failure(filename, 'write')
+    
+    def extract_isolated(self, pdf_bytes, filename):
+        """Extract in the limited worker process, so a hostile PDF cannot stall the loop"""
+        try:
+            result = self.extract_pool.submit(extract_worker, pdf_bytes, filename, page_cap()).result()
+        except Exception as e:
+            print(f"Error extracting {filename}: {e}")
+            return "", None
+        
+        if result == NEEDS_OCR:
+            return self.ocr_stage.run(pdf_bytes, filename) or ("", None)
+        return result or ("", None)
+    
+    def record_failure(self, filename, stage):
+        metrics.inc('cv_files_total', status='failed')
+        metrics.log_event('cv_failed', file=filename, stage=stage)
+    
+    def reextract_manual_review(self):
+        """Re-run field extraction on every manual_review row from cached text"""
+        managers = self.sheets_manager.managers.values() if self.routes else [self.sheets_manager]
+        for sheets_manager in managers:
+            updated, improved, skipped = sheets_manager.reextract_manual_review(self.result_cache, self.pdf_extractor)
+            print(f"Re-extracted {updated} manual_review rows in {sheets_manager.spreadsheet_id}: "
+                  f"{improved} now complete, {skipped} without cached text")
+    
+    def process_files(self, files):
+        """Process a batch of files, concurrently when the pipeline is enabled"""
+        if self.routes:
+            # Teams take turns for download, parse and write capacity
+            files = fair_order(files, self.sheets_manager.managers)
+        
+        if self.pipeline:
+            self.pipeline.run(files)
+        else:
+            for file_info in files:
+                self.process_cv(file_info)
     
     def process_all_existing(self):
         """Process all existing PDF files in the Drive folder"""
         try:
-            query = f"'{config.DRIVE_FOLDER_ID}' in parents and mimeType='application/pdf'"
+            print("Processing existing files...")
             
-            results = self.drive_monitor.drive_service.files().list(
-                q=query,
-                fields="files(id, name, modifiedTime, size)"
-            ).execute()
+            # Start the changes cursor before listing, so files uploaded
+            # during the backfill are in the first delta
+            if self.drive_monitor.mode == 'changes':
+                try:
+                    self.drive_monitor.load_page_token()
+                except Exception as e:
+                    print(f"Error starting Drive changes cursor: {e}")
             
-            files = results.get('files', [])
-            if files:
-                print(f"Processing {len(files)} existing files...")
-                
-                for file_info in files:
-                    filename = file_info['name']
-                    
-                    # Check for duplicates
-                    if self.sheets_manager.check_duplicate(filename):
-                        continue
-                    
-                    self.process_cv(file_info)
-                
-                print("Existing files processed")
-            else:
-                print("No existing files found")
+            # Finish whatever a previous run left in the queue
+            pending = self.job_queue.pending()
+            if pending:
+                print(f"Resuming {len(pending)} unfinished files")
+                self.process_files(pending)
+            
+            if self.routes:
+                self.backfill_routes()
+                return
+            
+            if self.job_queue.get_meta(f"backfill_complete{self.state_key}"):
+                # Poll from where the last run stopped instead of rescanning the folder
+                self.drive_monitor.last_check = (self.job_queue.get_meta(f"last_check{self.state_key}")
+                                                 or self.drive_monitor.last_check)
+                print("Folder already backfilled, skipping full rescan")
+                self.sheets_manager.flush()
+                return
+            
+            # Files stream in page by page, so work starts before the listing ends
+            self.process_files(self.job_queue.track(self.drive_monitor.iter_folder_files()))
+            self.sheets_manager.flush()
+            
+            self.job_queue.set_meta(f"backfill_complete{self.state_key}", self.drive_monitor.utc_now())
+            self.job_queue.set_meta(f"last_check{self.state_key}", self.drive_monitor.last_check)
+            print(f"Existing files processed ({self.drive_monitor.files_listed} listed)")
                 
         except Exception as e:
             print(f"Error processing existing files: {e}")
     
+    def backfill_routes(self):
+        """List the folders of routes added since the last run, then process their files"""
+        self.drive_monitor.last_check = self.job_queue.get_meta('last_check') or self.drive_monitor.last_check
+        new_routes = [route for route in self.routes if not self.job_queue.get_meta(f"backfill_complete:{route.name}")]
+        
+        if new_routes:
+            print(f"Backfilling {len(new_routes)} routes: {', '.join(route.name for route in new_routes)}")
+            # Listed in full before processing so the teams' files can be interleaved
+            folder_ids = [route.folder_id for route in new_routes]
+            for _ in self.job_queue.track(self.tag_routes(self.drive_monitor.iter_folder_files(folder_ids=folder_ids))):
+                pass
+            self.process_files(self.job_queue.pending())
+            
+            for route in new_routes:
+                self.job_queue.set_meta(f"backfill_complete:{route.name}", self.drive_monitor.utc_now())
+            print(f"Existing files processed ({self.drive_monitor.files_listed} listed)")
+        else:
+            print("Route folders already backfilled, skipping full rescan")
+        
+        self.sheets_manager.flush()
+        self.job_queue.set_meta('last_check', self.drive_monitor.last_check)
+    
     def run(self):
         """Main processing loop"""
         print("CV Processor started...")
         
+        metrics_server = None
+        if config.METRICS_PORT:
+            metrics_server = metrics.MetricsServer(config.METRICS_PORT)
+            metrics_server.start()
+        last_metrics_log = time.time()
+        
         # Process existing files first
         self.process_all_existing()
         
-        print(f"Now monitoring Drive folder every {config.POLL_INTERVAL} seconds")
+        scheduler = PollScheduler()
+        if scheduler.adaptive:
+            print(f"Now monitoring Drive folder every {scheduler.min_interval:g}-{scheduler.max_interval:g} seconds, "
+                  f"starting at {scheduler.interval:g}")
+        else:
+            print(f"Now monitoring Drive folder every {config.POLL_INTERVAL} seconds")
+        
+        if self.drive_monitor.mode == 'local':
+            self.drive_monitor.watch_changes()
+        elif self.drive_monitor.mode == 'changes' and config.DRIVE_WEBHOOK_ADDRESS:
+            self.drive_monitor.watch_changes(config.DRIVE_WEBHOOK_ADDRESS, config.DRIVE_WEBHOOK_PORT)
         
         while True:
             try:
-                new_files = self.drive_monitor.get_new_files()
+                new_files = list(self.job_queue.track(self.tag_routes(self.drive_monitor.get_new_files())))
+                self.job_queue.set_meta(f"last_check{self.state_key}", self.drive_monitor.last_check)
                 
                 if new_files:
-                    print(f"Found {len(new_files)} new files")
-                    for file_info in new_files:
-                        self.process_cv(file_info)
+                    latencies = scheduler.observe_detection(new_files)
+                    if latencies:
+                        print(f"Found {len(new_files)} new files, "
+                              f"{sum(latencies) / len(latencies):.1f}s after upload on average")
+                    else:
+                        print(f"Found {len(new_files)} new files")
                 
-                time.sleep(config.POLL_INTERVAL)
+                # New files plus earlier failures whose retry is due
+                pending = self.job_queue.pending()
+                metrics.set_gauge('cv_queue_depth', len(pending), queue='jobs_pending')
+                if pending:
+                    self.process_files(pending)
+                
+                self.sheets_manager.flush_if_due()
+                
+                if time.time() - last_metrics_log >= config.METRICS_LOG_INTERVAL:
+                    metrics.log_event('metrics', **metrics.registry.snapshot())
+                    last_metrics_log = time.time()
+                
+                scheduler.record(new_files)
+                self.drive_monitor.wait_for_changes(scheduler.time_until_next())
                 
             except KeyboardInterrupt:
                 print("\nStopping CV Processor...")
+                self.sheets_manager.flush()
+                self.drive_monitor.stop_watch()
+                if self.pipeline:
+                    self.pipeline.close()
+                elif self.ocr_stage:
+                    self.ocr_stage.close()
+                if self.extract_pool:
+                    self.extract_pool.shutdown()
+                if metrics_server:
+                    metrics_server.stop()
                 break
             except Exception as e:
                 print(f"Error in main loop: {e}")
                 time.sleep(config.POLL_INTERVAL)
 
 if __name__ == "__main__":
+    if '--profile' in sys.argv:
+        config.PROFILE_EXTRACTOR = True
+    
     processor = CVProcessor()
-    processor.run()
\ No newline at end of file
+    
+    if '--reconcile-index' in sys.argv:
+        processor.sheets_manager.reconcile_duplicate_index()
+    elif '--reextract-review' in sys.argv:
+        processor.reextract_manual_review()
+    elif '--retry-failed' in sys.argv:
+        print(f"Requeued {processor.job_queue.retry_failed()} failed files")
+    elif '--queue-status' in sys.argv:
+        for state, count in sorted(processor.job_queue.counts().items()):
+            print(f"{state}: {count}")
+    else:
+        processor.run()
\ No newline at end of file
@@ -0,0 +1,258 @@
+import cProfile
+import functools
+import json
+import multiprocessing
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import config
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+HELP = {
+    'cv_stage_seconds': ('histogram', 'Time spent per processing stage'),
+    'cv_files_total': ('counter', 'Files handled, by outcome'),
+    'cv_downloaded_bytes_total': ('counter', 'Bytes downloaded from Drive'),
+    'cv_pages_parsed_total': ('counter', 'PDF pages read'),
+    'cv_api_requests_total': ('counter', 'Google API requests, by API and read/write quota'),
+    'cv_api_retries_total': ('counter', 'Google API requests retried, by status'),
+    'cv_extract_limits_total': ('counter', 'Documents stopped by an isolated worker limit, by limit'),
+    'cv_extract_worker_restarts_total': ('counter', 'Isolated extraction workers replaced, by reason'),
+    'cv_detection_latency_seconds': ('histogram', 'Time from a file\'s upload or last change until a poll found it'),
+    'cv_queue_depth': ('gauge', 'Items waiting in each queue'),
+    'cv_poll_interval_seconds': ('gauge', 'Current interval between polls for new files'),
+    'cv_manual_review_ratio': ('gauge', 'Share of written rows flagged manual_review'),
+}
+
+class Metrics:
+    """In-process counters, gauges and stage histograms"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.forward_queue = None
+    
+    def key(self, name, labels):
+        return name, tuple(sorted(labels.items()))
+    
+    def inc(self, name, value=1, **labels):
+        key = self.key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+    
+    def set_gauge(self, name, value, **labels):
+        with self.lock:
+            self.gauges[self.key(name, labels)] = value
+    
+    def observe(self, name, value, **labels):
+        key = self.key(name, labels)
+        with self.lock:
+            buckets, total, count = self.histograms.get(key, ([0] * len(STAGE_BUCKETS), 0.0, 0))
+            buckets = [n + (value <= bound) for n, bound in zip(buckets, STAGE_BUCKETS)]
+            self.histograms[key] = (buckets, total + value, count + 1)
+    
+    def drain(self):
+        """Return and reset counters and histograms, for forwarding from a worker process"""
+        with self.lock:
+            snapshot = (self.counters, self.histograms)
+            self.counters, self.histograms = {}, {}
+        return snapshot
+    
+    def merge(self, snapshot):
+        counters, histograms = snapshot
+        with self.lock:
+            for key, value in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            for key, (buckets, total, count) in histograms.items():
+                old_buckets, old_total, old_count = self.histograms.get(key, ([0] * len(STAGE_BUCKETS), 0.0, 0))
+                self.histograms[key] = ([a + b for a, b in zip(old_buckets, buckets)],
+                                        old_total + total, old_count + count)
+    
+    def manual_review_ratio(self):
+        written = {dict(labels).get('status'): value for (name, labels), value in self.counters.items()
+                   if name == 'cv_files_total'}
+        total = written.get('success', 0) + written.get('manual_review', 0)
+        return written.get('manual_review', 0) / total if total else 0.0
+    
+    def render(self):
+        """Prometheus text exposition format"""
+        self.set_gauge('cv_manual_review_ratio', round(self.manual_review_ratio(), 4))
+        with self.lock:
+            series = {}
+            for (name, labels), value in self.counters.items():
+                series.setdefault(name, []).append((labels, value))
+            for (name, labels), value in self.gauges.items():
+                series.setdefault(name, []).append((labels, value))
+            for (name, labels), value in self.histograms.items():
+                series.setdefault(name, []).append((labels, value))
+        
+        lines = []
+        for name in sorted(series):
+            kind, description = HELP.get(name, ('untyped', name))
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(series[name]):
+                if kind != 'histogram':
+                    lines.append(f"{name}{format_labels(labels)} {value}")
+                    continue
+                
+                buckets, total, count = value
+                for bound, n in zip(STAGE_BUCKETS, buckets):
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', str(bound)),))} {n}")
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{format_labels(labels)} {round(total, 6)}")
+                lines.append(f"{name}_count{format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+    
+    def snapshot(self):
+        """Flat summary for JSON logs"""
+        with self.lock:
+            summary = {}
+            for (name, labels), value in list(self.counters.items()) + list(self.gauges.items()):
+                summary[name + ''.join(f".{v}" for _, v in labels)] = value
+            for (name, labels), (_, total, count) in self.histograms.items():
+                stage = ''.join(f".{v}" for _, v in labels)
+                summary[f"{name}{stage}.count"] = count
+                summary[f"{name}{stage}.avg"] = round(total / count, 6) if count else 0
+        summary['cv_manual_review_ratio'] = round(self.manual_review_ratio(), 4)
+        return summary
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+registry = Metrics()
+
+def inc(name, value=1, **labels):
+    registry.inc(name, value, **labels)
+
+def set_gauge(name, value, **labels):
+    registry.set_gauge(name, value, **labels)
+
+@contextmanager
+def timer(stage):
+    """Record the wall time of a block under cv_stage_seconds{stage}"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe('cv_stage_seconds', time.perf_counter() - start, stage=stage)
+
+def observe_stage(stage, seconds):
+    registry.observe('cv_stage_seconds', seconds, stage=stage)
+
+def log_event(event, **fields):
+    """Print a structured JSON log line when JSON logs are enabled"""
+    if not config.METRICS_JSON_LOGS:
+        return
+    record = {'ts': datetime.now(timezone.utc).isoformat(), 'event': event}
+    record.update(fields)
+    print(json.dumps(record, default=str), flush=True)
+
+# Worker processes forward their metrics to the parent after each task
+
+def init_worker(queue):
+    """ProcessPoolExecutor initializer for parse and OCR workers"""
+    # A forked worker starts with a copy of the parent's counts; drop them
+    registry.drain()
+    registry.forward_queue = queue
+
+def forward():
+    if registry.forward_queue is not None:
+        registry.forward_queue.put(registry.drain())
+
+def collect(queue):
+    """Merge metrics forwarded by worker processes until None arrives"""
+    while True:
+        snapshot = queue.get()
+        if snapshot is None:
+            break
+        registry.merge(snapshot)
+
+def start_collector():
+    """Return a queue for init_worker, drained into this process's registry"""
+    queue = multiprocessing.Queue()
+    threading.Thread(target=collect, args=(queue,), daemon=True).start()
+    return queue
+
+class MetricsServer:
+    """Serves the registry at /metrics in Prometheus text format"""
+    
+    def __init__(self, port):
+        self.port = port
+        self.server = None
+    
+    def start(self):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        # Bound to localhost only; put a proxy in front to scrape from elsewhere
+        self.server = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        print(f"Serving metrics on http://127.0.0.1:{self.port}/metrics")
+    
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server = None
+
+# Sampled cProfile of extractor hot paths (PROFILE_EXTRACTOR=true)
+
+_profile_state = threading.local()
+_profile_lock = threading.Lock()
+_profile_calls = 0
+_profile_stats = None
+
+def profiled(func):
+    """Profile every PROFILE_EVERY-th call and accumulate stats in PROFILE_FILE.<pid>"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        global _profile_calls
+        if not config.PROFILE_EXTRACTOR or getattr(_profile_state, 'active', False):
+            return func(*args, **kwargs)
+        
+        with _profile_lock:
+            _profile_calls += 1
+            sample = _profile_calls % config.PROFILE_EVERY == 0
+        if not sample:
+            return func(*args, **kwargs)
+        
+        profiler = cProfile.Profile()
+        _profile_state.active = True
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            _profile_state.active = False
+            save_profile(profiler)
+    return wrapper
+
+def save_profile(profiler):
+    global _profile_stats
+    with _profile_lock:
+        if _profile_stats is None:
+            _profile_stats = pstats.Stats(profiler)
+        else:
+            _profile_stats.add(profiler)
+        _profile_stats.dump_stats(f"{config.PROFILE_FILE}.{os.getpid()}")
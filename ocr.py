@@ -0,0 +1,124 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pdf_extractor import PDFExtractor, FieldScan
+import metrics
+import config
+
+try:
+    import pytesseract
+    import pdf2image
+    from pdf2image.exceptions import PDFPopplerTimeoutError
+except ImportError:
+    pytesseract = None
+    pdf2image = None
+    PDFPopplerTimeoutError = None
+
+_ocr_extractor = None
+
+def needs_ocr(text, pages_read):
+    """Check if the text layer is too thin to be anything but a scan"""
+    if not config.OCR_ENABLED:
+        return False
+    return len(text or '') < config.OCR_MIN_CHARS_PER_PAGE * max(pages_read, 1)
+
+def ocr_worker(pdf_bytes, filename, max_pages=None):
+    """Render and OCR a PDF page by page in a worker process"""
+    try:
+        with metrics.timer('ocr'):
+            return ocr_pages(pdf_bytes, filename, max_pages)
+    finally:
+        metrics.forward()
+
+def ocr_pages(pdf_bytes, filename, max_pages=None):
+    global _ocr_extractor
+    if _ocr_extractor is None:
+        _ocr_extractor = PDFExtractor()
+    
+    max_pages = max_pages or config.OCR_MAX_PAGES
+    page_count = pdf2image.pdfinfo_from_bytes(pdf_bytes)['Pages']
+    if max_pages:
+        page_count = min(page_count, max_pages)
+    
+    pages = []
+    scan = FieldScan(_ocr_extractor)
+    for number in range(1, page_count + 1):
+        # One page at a time keeps a single rendered image in memory
+        try:
+            images = pdf2image.convert_from_bytes(pdf_bytes, dpi=config.OCR_DPI, first_page=number,
+                                                  last_page=number, timeout=config.OCR_PAGE_TIMEOUT)
+        except PDFPopplerTimeoutError as e:
+            print(f"OCR skipped page {number} of {filename}: rendering timed out ({e})")
+            continue
+        page_texts = []
+        for image in images:
+            try:
+                page_texts.append(pytesseract.image_to_string(image, lang=config.OCR_LANGUAGES,
+                                                              timeout=config.OCR_PAGE_TIMEOUT))
+            except RuntimeError as e:
+                print(f"OCR skipped page {number} of {filename}: {e}")
+        
+        pages.extend(page_texts)
+        if config.PDF_EARLY_EXIT and page_texts and scan.add_page("\n".join(page_texts)):
+            break
+    
+    text = "\n".join(pages).strip()
+    if not text:
+        return None
+    return text, _ocr_extractor.extract_fields(text, filename)
+
+class OCRStage:
+    """Separate, capped process pool so scanned PDFs never hold up text PDFs"""
+    
+    def __init__(self, workers=None):
+        if pytesseract is None or pdf2image is None:
+            raise RuntimeError("OCR needs pytesseract and pdf2image: pip install pytesseract pdf2image")
+        
+        self.workers = workers or config.OCR_WORKERS
+        self.metrics_queue = metrics.start_collector()
+        self.pool_lock = threading.Lock()
+        self.pool = self.make_pool()
+    
+    def make_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=metrics.init_worker,
+                                   initargs=(self.metrics_queue,))
+    
+    def restart_pool(self, broken):
+        """Replace a process pool left broken by a worker that died, e.g. an OOM kill while rendering"""
+        with self.pool_lock:
+            if self.pool is not broken:
+                return
+            print("An OCR worker died, restarting the OCR pool")
+            broken.shutdown(wait=False)
+            self.pool = self.make_pool()
+    
+    def submit(self, pdf_bytes, filename):
+        """Queue a PDF for OCR; the future resolves to (text, fields) or None"""
+        pool = self.pool
+        try:
+            future = pool.submit(ocr_worker, pdf_bytes, filename)
+        except BrokenProcessPool:
+            self.restart_pool(pool)
+            pool = self.pool
+            future = pool.submit(ocr_worker, pdf_bytes, filename)
+        
+        # The document that killed a worker fails, but later ones get a fresh pool
+        future.add_done_callback(lambda f: self.check_pool(f, pool))
+        return future
+    
+    def check_pool(self, future, pool):
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self.restart_pool(pool)
+    
+    def run(self, pdf_bytes, filename):
+        """OCR a PDF and wait for the result"""
+        print(f"Running OCR on: {filename}")
+        try:
+            return self.submit(pdf_bytes, filename).result()
+        except Exception as e:
+            print(f"Error running OCR on {filename}: {e}")
+            return None
+    
+    def close(self):
+        self.pool.shutdown(wait=True)
+        self.metrics_queue.put(None)
@@ -1,9 +1,83 @@
-import PyPDF2
+import io
 import re
 import os
+import time
+from contextlib import contextmanager
+from pdf_backends import get_backends
+import metrics
+import config
+
+# Patterns are compiled once at import and shared by every extractor instance.
+# Emails may only start at the beginning of a run of address characters, which
+# keeps the scan linear instead of retrying from every character of each word.
+EMAIL_RE = re.compile(r'(?<![a-zA-Z0-9._-])[a-zA-Z0-9._-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+# find_emails walks back from each '@' over these, then matches the domain forwards
+EMAIL_LOCAL_CHARS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._-')
+EMAIL_DOMAIN_RE = re.compile(r'[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+
+# Compact +212, 212 and 0 forms, then the same forms with separators. Each
+# is its own pass, as a spaced match can swallow a compact number that its
+# own pass would find. Literal prefixes let each pass skip quickly through the text.
+PHONE_SEPARATOR = r'[\s\-\.]*'
+PHONE_DIGITS = (PHONE_SEPARATOR + r'\d') * 8
+PHONE_RES = [
+    re.compile(r'\+212[67]\d{8}'),
+    re.compile(r'212[67]\d{8}'),
+    re.compile(r'0[567]\d{8}'),
+    re.compile(r'\+212' + PHONE_SEPARATOR + r'[67]' + PHONE_DIGITS),
+    re.compile(r'212' + PHONE_SEPARATOR + r'[67]' + PHONE_DIGITS),
+    re.compile(r'0' + PHONE_SEPARATOR + r'[567]' + PHONE_DIGITS),
+]
+NON_PHONE_CHARS_RE = re.compile(r'[^\d+]')
+
+CAPS_NAME_RE = re.compile(r'\b([A-Z]{2,}\s+[A-Z]{2,}(?:\s+[A-Z]{2,})?)\b')
+NAME_LABEL_RES = [
+    re.compile(r'(?:name|full\s*name|candidate\s*name)[:]\s*([A-Za-z\s\-\.]{3,50})', re.IGNORECASE | re.MULTILINE),
+    re.compile(r'([A-Za-z\s\-\.]{3,50})\s*-\s*(?:cv|resume|curriculum)', re.IGNORECASE | re.MULTILINE),
+]
+VALID_NAME_RE = re.compile(r'^[A-Za-z\s\-\.]+$')
+FILENAME_WORD_RES = [
+    re.compile(rf'\b{word}\b', re.IGNORECASE)
+    for word in ['cv', 'resume', 'curriculum', 'vitae', '_', '-']
+]
+NAME_PREFIXES = frozenset(['mr', 'mrs', 'ms', 'dr', 'prof'])
+COMMON_DOMAINS = frozenset(['gmail.com', 'outlook.com', 'icloud.com', 'yahoo.com', 'hotmail.com', 'indeedemail.com'])
+# Characters of the previous page rescanned with each new one, so a phone
+# number or name label split across the page break is still seen
+PAGE_OVERLAP = 200
+
+def leading_lines(text, count):
+    """First count non-blank lines, stripped, without splitting the whole text"""
+    head = text.split('\n', count * 2)
+    if len(head) > count * 2:
+        # The last item is the unsplit rest of the text
+        lines = [line.strip() for line in head[:-1] if line.strip()]
+        if len(lines) >= count:
+            return lines[:count]
+        head = text.split('\n')
+    return [line.strip() for line in head if line.strip()][:count]
+
+def find_emails(text):
+    """Same matches as EMAIL_RE.findall, but only tried around each '@'"""
+    emails = []
+    end = 0
+    at = text.find('@')
+    while at != -1:
+        start = at
+        while start > 0 and text[start - 1] in EMAIL_LOCAL_CHARS:
+            start -= 1
+        # A run that began inside the previous match cannot start another one
+        if end <= start < at:
+            match = EMAIL_DOMAIN_RE.match(text, at + 1)
+            if match:
+                emails.append(text[start:match.end()])
+                end = match.end()
+        at = text.find('@', at + 1)
+    return emails
 
 class PDFExtractor:
-    def __init__(self):
+    def __init__(self, backend=None, fallback=True):
+        self.backends = get_backends(backend or config.PDF_BACKEND, fallback)
         self.phone_pattern = r'(\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}'
         self.skip_words = ['curriculum', 'vitae', 'resume', 'cv', 'polytechnic', 'university', 'college', 'designer', 'engineer', 'manager', 'developer', 'analyst', 'graphics', 'personal', 'contact', 'information', 'profile', 'objective', 'summary']
         
@@ -15,31 +89,97 @@ class PDFExtractor:
             'projets', 'projects', 'references', 'loisirs', 'hobbies', 'coordonnees',
             'contact details', 'personal details', 'informations personnelles'
         ]
+        
+        # Compiled alternations of the word lists above, keyed by their contents
+        self.vocabulary_res = {}
     
-    def extract_text(self, pdf_path):
-        """Extract text from PDF"""
+        # Pages read by the last extract_text_and_fields call
+        self.pages_read = 0
+    
+    @metrics.profiled
+    def extract_text(self, source, max_pages=None):
+        """Extract text from PDF path, bytes, memoryview or file-like stream"""
         try:
-            with open(pdf_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text() + "\n"
-            
-            os.remove(pdf_path)  
-            return text.strip()
+            with self.open_source(source) as stream:
+                pages = list(self.iter_pages(stream, max_pages))
+            return "\n".join(pages).strip()
         except Exception as e:
-            print(f"Error extracting text from {pdf_path}: {e}")
+            print(f"Error extracting text from {self.describe_source(source)}: {e}")
             return ""
     
+    @metrics.profiled
+    def extract_text_and_fields(self, source, filename='', max_pages=None):
+        """Read pages lazily, stopping once a name, personal email and mobile number are found"""
+        pages = []
+        scan = FieldScan(self)
+        self.pages_read = 0
+        try:
+            with self.open_source(source) as stream:
+                for page_text in self.iter_pages(stream, max_pages):
+                    pages.append(page_text)
+                    self.pages_read = len(pages)
+                    if config.PDF_EARLY_EXIT and scan.add_page(page_text):
+                        break
+        except Exception as e:
+            print(f"Error extracting text from {self.describe_source(source)}: {e}")
+            return "", None
+        
+        text = "\n".join(pages).strip()
+        if not text:
+            return "", None
+        return text, self.extract_fields(text, filename)
+    
+    @contextmanager
+    def open_source(self, source):
+        """Open a path, bytes or stream as a readable PDF stream"""
+        if isinstance(source, str):
+            # Legacy temp-file path: read it, then remove it
+            try:
+                with open(source, 'rb') as file:
+                    yield file
+            finally:
+                os.remove(source)
+            return
+        
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        yield source
+    
+    def iter_pages(self, stream, max_pages=None):
+        """Yield the text of each page, stopping at the page cap"""
+        max_pages = config.PDF_MAX_PAGES if max_pages is None else max_pages
+        
+        # If a backend fails part way, the next one re-reads the file and
+        # continues after the pages already yielded
+        yielded = 0
+        for index, backend in enumerate(self.backends):
+            try:
+                stream.seek(0)
+                start = time.perf_counter()
+                for i, page_text in enumerate(backend.iter_pages(stream, max_pages)):
+                    metrics.observe_stage('parse', time.perf_counter() - start)
+                    metrics.inc('cv_pages_parsed_total')
+                    if i >= yielded:
+                        yielded += 1
+                        yield page_text
+                    start = time.perf_counter()
+                return
+            except Exception as e:
+                if index == len(self.backends) - 1:
+                    raise
+                print(f"{backend.name} could not read PDF, trying {self.backends[index + 1].name}: {e}")
+    
+    def describe_source(self, source):
+        return source if isinstance(source, str) else 'PDF stream'
+    
     def extract_name_from_filename(self, filename):
         """Extract name from PDF filename"""
         # Remove file extension
         name = filename.replace('.pdf', '').replace('.PDF', '')
         
         # Clean common CV-related words from filename
-        cv_words = ['cv', 'resume', 'curriculum', 'vitae', '_', '-']
-        for word in cv_words:
-            name = re.sub(rf'\b{word}\b', ' ', name, flags=re.IGNORECASE)
+        for word_re in FILENAME_WORD_RES:
+            name = word_re.sub(' ', name)
         
         # Clean and validate
         cleaned = self.clean_name(name)
@@ -47,14 +187,15 @@ class PDFExtractor:
             return cleaned
         return ''
     
-    def extract_name(self, text, filename=''):
+    def extract_name(self, text, filename='', judge=None):
         """Robust name detector prioritizing document titles"""
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
+        judge = judge or self.judge_line
+        lines = leading_lines(text, 15)
         
         # Pattern 1: Document title/header (first 6 lines with high priority)
         for i, line in enumerate(lines[:6]):
-            candidate = self.clean_name(line)
-            if self.is_valid_name(candidate) and not self.is_section_header(candidate):
+            candidate, valid, header = judge(line)
+            if valid and not header:
                 words = candidate.split()
                 if len(words) >= 2 and len(candidate) >= 6:
                     # Highest priority for first 3 lines
@@ -64,31 +205,15 @@ class PDFExtractor:
                     elif i <= 5 and len(words) <= 3:
                         return candidate
         
-        # Pattern 2: ALL CAPS names (common CV titles)
-        caps_pattern = r'\b([A-Z]{2,}\s+[A-Z]{2,}(?:\s+[A-Z]{2,})?)\b'
-        caps_matches = re.findall(caps_pattern, text)
-        for match in caps_matches:
-            candidate = self.clean_name(match)
-            if self.is_valid_name(candidate) and len(candidate.split()) <= 4:
-                return candidate
-        
-        # Pattern 3: Explicit NAME: labels anywhere in document
-        name_label_patterns = [
-            r'(?:name|full\s*name|candidate\s*name)[:]\s*([A-Za-z\s\-\.]{3,50})',
-            r'([A-Za-z\s\-\.]{3,50})\s*-\s*(?:cv|resume|curriculum)',
-        ]
-        
-        for pattern in name_label_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE | re.MULTILINE)
-            for match in matches:
-                candidate = self.clean_name(match)
-                if self.is_valid_name(candidate):
-                    return candidate
+        # Patterns 2 and 3: ALL CAPS titles and NAME: labels anywhere in document
+        candidate = self.body_name(text, judge)
+        if candidate:
+            return candidate
         
         # Pattern 4: Look for names in remaining first 15 lines
         for line in lines[5:15]:
-            candidate = self.clean_name(line)
-            if self.is_valid_name(candidate):
+            candidate, valid, _ = judge(line)
+            if valid:
                 if len(candidate.split()) >= 2 and len(candidate) >= 6:
                     return candidate
         
@@ -100,6 +225,31 @@ class PDFExtractor:
         
         return ''
     
+    def body_name(self, text, judge=None):
+        """First ALL CAPS name, then first labelled name, anywhere in the text"""
+        judge = judge or self.judge_line
+        
+        # Pattern 2: ALL CAPS names (common CV titles)
+        for match in CAPS_NAME_RE.findall(text):
+            candidate, valid, _ = judge(match)
+            if valid and len(candidate.split()) <= 4:
+                return candidate
+        
+        # Pattern 3: Explicit NAME: labels anywhere in document
+        for label_re in NAME_LABEL_RES:
+            for match in label_re.findall(text):
+                candidate, valid, _ = judge(match)
+                if valid:
+                    return candidate
+        
+        return ''
+    
+    def judge_line(self, line):
+        """Clean a line and check it: (candidate, is valid name, is section header)"""
+        candidate = self.clean_name(line)
+        valid = self.is_valid_name(candidate)
+        return candidate, valid, valid and self.is_section_header(candidate)
+    
     def clean_name(self, name_str):
         """Clean and normalize name string"""
         if not name_str:
@@ -107,12 +257,9 @@ class PDFExtractor:
         
         cleaned = ' '.join(name_str.split())
         
-        # Remove common prefixes/suffixes
-        prefixes = ['mr', 'mrs', 'ms', 'dr', 'prof']
-        suffixes = ['jr', 'sr', 'ii', 'iii']
-        
+        # Remove common prefixes
         words = cleaned.lower().split()
-        words = [w for w in words if w not in prefixes]
+        words = [w for w in words if w not in NAME_PREFIXES]
         
         # Convert to title case
         return ' '.join(word.capitalize() for word in words if word.isalpha() or '-' in word)
@@ -123,18 +270,17 @@ class PDFExtractor:
             return False
         
         # Must contain only letters, spaces, hyphens, dots
-        if not re.match(r'^[A-Za-z\s\-\.]+$', name_str):
-            return False
-        
-        # Check against skip words
-        name_lower = name_str.lower()
-        if any(skip in name_lower for skip in self.skip_words):
+        if not VALID_NAME_RE.match(name_str):
             return False
         
         words = name_str.split()
         if not (2 <= len(words) <= 4):
             return False
         
+        # Check against skip words
+        if self.vocabulary_re(self.skip_words).search(name_str.lower()):
+            return False
+        
         if any(len(word) < 2 or len(word) > 20 for word in words):
             return False
         
@@ -143,27 +289,41 @@ class PDFExtractor:
     def is_section_header(self, text):
         """Check if text is a section header to ignore"""
         text_lower = text.lower().strip()
-        return any(banned in text_lower for banned in self.banned_sections)
+        return self.vocabulary_re(self.banned_sections).search(text_lower) is not None
+    
+    def vocabulary_re(self, words):
+        """Compile a word list into one alternation, so text is scanned once rather than once per word"""
+        key = tuple(words)
+        if key not in self.vocabulary_res:
+            pattern = '|'.join(re.escape(word) for word in sorted(key, key=len, reverse=True))
+            self.vocabulary_res[key] = re.compile(pattern or r'(?!)')
+        return self.vocabulary_res[key]
+    
+    def scan_contacts(self, text):
+        """Collect email and phone candidates from the text"""
+        emails = find_emails(text)
+        
+        phones = []
+        for rank, phone_re in enumerate(PHONE_RES):
+            for match in phone_re.finditer(text):
+                phones.append((rank, match.start(), match.group()))
+        
+        return emails, phones
     
-    def extract_email(self, text):
+    def extract_email(self, text, candidates=None):
         """Extract exactly ONE email address following specific rules"""
         if not text:
             return ''
         
-        email_pattern = r'[a-zA-Z0-9._-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-        matches = re.findall(email_pattern, text, re.IGNORECASE)
-        
-        if not matches:
-            return ''
+        if candidates is None:
+            candidates, _ = self.scan_contacts(text)
         
         valid_emails = []
-        for match in matches:
-            cleaned = re.match(r'^[a-zA-Z0-9._-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', match)
-            if cleaned:
-                email = cleaned.group().lower()
-                domain = email.split('@')[1]
-                if self.is_valid_domain(domain):
-                    valid_emails.append(email)
+        for match in candidates:
+            email = match.lower()
+            domain = email.split('@')[1]
+            if self.is_valid_domain(domain):
+                valid_emails.append(email)
         
         if not valid_emails:
             return ''
@@ -180,9 +340,7 @@ class PDFExtractor:
     
     def is_valid_domain(self, domain):
         """Check if domain is valid"""
-        common_domains = ['gmail.com', 'outlook.com', 'icloud.com', 'yahoo.com', 'hotmail.com', 'indeedemail.com']
-        
-        if domain in common_domains:
+        if domain in COMMON_DOMAINS:
             return True
         
         if '.' in domain and len(domain.split('.')[-1]) >= 2:
@@ -190,32 +348,18 @@ class PDFExtractor:
         
         return False
     
-    def extract_phone(self, text):
+    def extract_phone(self, text, candidates=None):
         """Extract exactly ONE Moroccan phone number"""
         if not text:
             return ''
         
-        # Find all potential phone patterns
-        phone_patterns = [
-            r'\+212[67]\d{8}',
-            r'212[67]\d{8}',
-            r'0[567]\d{8}',
-            r'\+212[\s\-\.]*[67][\s\-\.]*\d[\s\-\.]*\d[\s\-\.]*\d[\s\-\.]*\d[\s\-\.]*\d[\s\-\.]*\d[\s\-\.]*\d[\s\-\.]*\d',
-            r'212[\s\-\.]*[67][\s\-\.]*\d[\s\-\.]*\d[\s\-\.]*\d[\s\-\.]*\d[\s\-\.]*\d[\s\-\.]*\d[\s\-\.]*\d[\s\-\.]*\d',
-            r'0[\s\-\.]*[567][\s\-\.]*\d[\s\-\.]*\d[\s\-\.]*\d[\s\-\.]*\d[\s\-\.]*\d[\s\-\.]*\d[\s\-\.]*\d[\s\-\.]*\d'
-        ]
-        
-        matches = []
-        for pattern in phone_patterns:
-            matches.extend(re.findall(pattern, text))
-        
-        if not matches:
-            return ''
+        if candidates is None:
+            _, candidates = self.scan_contacts(text)
         
-        # Clean and normalize
-        valid_phones = []
-        for match in matches:
-            digits = re.sub(r'[^\d+]', '', match)
+        # Candidates keep the order of the passes in PHONE_RES, each in text order
+        ranked = []
+        for rank, position, match in candidates:
+            digits = NON_PHONE_CHARS_RE.sub('', match)
             
             if len(digits) < 8:
                 continue
@@ -231,7 +375,9 @@ class PDFExtractor:
                 continue
             
             if len(normalized) == 13 and normalized[4] in '567':
-                valid_phones.append(normalized)
+                ranked.append((rank, position, normalized))
+        
+        valid_phones = [phone for _, _, phone in sorted(ranked)]
         
         # Prefer mobile numbers (06, 07)
         mobile_phones = [p for p in valid_phones if p[4] in '67']
@@ -242,8 +388,39 @@ class PDFExtractor:
         
         return ''
     
+    @metrics.profiled
     def extract_fields(self, text, filename=''):
         """Extract name, email, phone from text"""
+        start = time.perf_counter()
+        result = self.build_fields(text, self.extract_name(text, filename))
+        metrics.observe_stage('extract', time.perf_counter() - start)
+        return result
+    
+    @metrics.profiled
+    def extract_fields_batch(self, texts, filenames=None):
+        """Extract name, email, phone from many texts; same results as extract_fields on each"""
+        if not texts:
+            return []
+        
+        # Headers, labels and boilerplate repeat across CVs, so each distinct
+        # line is cleaned and checked against the vocabularies once per batch
+        judged = {}
+        def judge(line):
+            if line not in judged:
+                judged[line] = self.judge_line(line)
+            return judged[line]
+        
+        start = time.perf_counter()
+        filenames = filenames or [''] * len(texts)
+        results = [self.build_fields(text, self.extract_name(text, filename, judge))
+                   for text, filename in zip(texts, filenames)]
+        
+        per_doc = (time.perf_counter() - start) / len(texts)
+        for _ in texts:
+            metrics.observe_stage('extract', per_doc)
+        return results
+    
+    def build_fields(self, text, name):
         result = {
             'name': '',
             'email': '',
@@ -251,14 +428,70 @@ class PDFExtractor:
             'status': 'success'
         }
     
-        result['email'] = self.extract_email(text)
+        emails, phones = self.scan_contacts(text)
+        
+        result['email'] = self.extract_email(text, emails)
         
-        result['phone'] = self.extract_phone(text)
+        result['phone'] = self.extract_phone(text, phones)
         
-        result['name'] = self.extract_name(text, filename)
+        result['name'] = name
         
         missing_fields = [k for k, v in result.items() if k != 'status' and not v]
         if missing_fields:
             result['status'] = 'manual_review'
+        return result
+
+class FieldScan:
+    """Tracks, one page at a time, whether a name, personal email and mobile number have turned up"""
+    # Only each new page is scanned, so the check stays linear in the pages
+    # read. It is a stopping rule, not a guarantee: a later page can still
+    # change the chosen values (a compact mobile number outranks a spaced one
+    # already found), so early exit can give different fields than a full read.
+    
+    def __init__(self, extractor):
+        self.extractor = extractor
+        self.head = ''
+        self.head_checked = True
+        self.tail = ''
+        # Pages past the head that have not been searched for a name yet
+        self.unchecked = []
+        self.email = False
+        self.phone = False
+        self.name = False
+    
+    def add_page(self, page_text):
+        """Scan one more page; returns True once all three fields have been found"""
+        window = self.tail + '\n' + page_text if self.tail else page_text
+        # Start the carried-over text on a line boundary, as a pattern cut mid-line matches differently
+        tail = window[-PAGE_OVERLAP:]
+        self.tail = tail[tail.find('\n') + 1:] if len(window) > PAGE_OVERLAP else tail
+        
+        if not self.email or not self.phone:
+            emails, phones = self.extractor.scan_contacts(window)
+            if not self.email:
+                email = self.extractor.extract_email(window, emails)
+                self.email = bool(email) and not email.endswith('@indeedemail.com')
+            if not self.phone:
+                phone = self.extractor.extract_phone(window, phones)
+                self.phone = bool(phone) and phone[4] in '67'
+        
+        if not self.name:
+            # Title lines only count in the first lines of the document
+            if len(leading_lines(self.head, 15)) < 15:
+                self.head = self.head + '\n' + page_text if self.head else page_text
+                self.head_checked = False
+            else:
+                self.unchecked.append(window)
+        
+        # Name patterns are the slowest, so they wait until email and phone are in
+        if not (self.email and self.phone):
+            return False
+        
+        if not self.name and not self.head_checked:
+            self.name = bool(self.extractor.extract_name(self.head))
+            self.head_checked = True
+        while not self.name and self.unchecked:
+            self.name = bool(self.extractor.body_name(self.unchecked.pop(0)))
+        self.unchecked = []
         
-        return result
\ No newline at end of file
+        return self.name
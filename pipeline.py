@@ -0,0 +1,279 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from drive_monitor import DriveMonitor, exceeds_download_limit
+from pdf_extractor import PDFExtractor
+from ocr import needs_ocr
+from isolation import IsolatedPool, page_cap
+from job_queue import DOWNLOADED, EXTRACTED, WRITTEN
+import metrics
+import config
+
+_worker_extractor = None
+
+# Returned by extract_worker when the PDF has no usable text layer
+NEEDS_OCR = 'needs_ocr'
+
+def extract_worker(pdf_bytes, filename, max_pages=None):
+    """Parse a downloaded PDF in a worker process"""
+    global _worker_extractor
+    if _worker_extractor is None:
+        _worker_extractor = PDFExtractor()
+    
+    try:
+        text, extracted_data = _worker_extractor.extract_text_and_fields(pdf_bytes, filename, max_pages)
+    finally:
+        metrics.forward()
+    if needs_ocr(text, _worker_extractor.pages_read):
+        return NEEDS_OCR
+    if not text:
+        return None
+    return text, extracted_data
+
+class CVPipeline:
+    """Download, parse and write stages running concurrently with bounded in-flight work"""
+    
+    def __init__(self, sheets_manager, result_cache, download_workers=None, parse_workers=None, queue_size=None,
+                 drive_monitor_factory=DriveMonitor, async_client=None, job_queue=None, ocr_stage=None,
+                 source='Google Drive'):
+        self.sheets_manager = sheets_manager
+        self.result_cache = result_cache
+        self.job_queue = job_queue
+        self.source = source
+        self.extractor = PDFExtractor()
+        self.download_workers = download_workers or config.DOWNLOAD_WORKERS
+        self.parse_workers = parse_workers or config.PARSE_WORKERS
+        self.queue_size = queue_size or config.PIPELINE_QUEUE_SIZE
+        
+        self.download_pool = ThreadPoolExecutor(max_workers=self.download_workers)
+        self.metrics_queue = metrics.start_collector()
+        self.parse_pool_lock = threading.Lock()
+        self.parse_pool = self.make_parse_pool()
+        self.max_pages = page_cap() if config.ISOLATED_EXTRACTION else None
+        
+        # googleapiclient services are not thread-safe, so each download thread gets its own
+        self.thread_state = threading.local()
+        self.drive_monitor_factory = drive_monitor_factory
+        
+        # With an AsyncClientThread, downloads are coroutines sharing one connection pool
+        self.async_client = async_client
+        
+        # Scanned PDFs go to their own capped pool instead of the parse pool
+        self.ocr_stage = ocr_stage
+    
+    def make_parse_pool(self):
+        if config.ISOLATED_EXTRACTION:
+            # Hostile PDFs can only take down their own worker process
+            return IsolatedPool(self.parse_workers, self.metrics_queue)
+        return ProcessPoolExecutor(max_workers=self.parse_workers, initializer=metrics.init_worker,
+                                   initargs=(self.metrics_queue,))
+    
+    def restart_parse_pool(self, broken):
+        """Replace a process pool left broken by a worker that died, e.g. a segfault or OOM kill"""
+        with self.parse_pool_lock:
+            if self.parse_pool is not broken:
+                return
+            print("A parse worker died, restarting the parse pool")
+            broken.shutdown(wait=False)
+            self.parse_pool = self.make_parse_pool()
+    
+    def submit_parse(self, pdf_bytes, filename):
+        """Submit a parse task, restarting the pool once if it is broken; returns (pool, future)"""
+        pool = self.parse_pool
+        try:
+            return pool, pool.submit(extract_worker, pdf_bytes, filename, self.max_pages)
+        except BrokenProcessPool:
+            self.restart_parse_pool(pool)
+            pool = self.parse_pool
+            return pool, pool.submit(extract_worker, pdf_bytes, filename, self.max_pages)
+    
+    def get_drive_monitor(self):
+        if not hasattr(self.thread_state, 'drive_monitor'):
+            self.thread_state.drive_monitor = self.drive_monitor_factory()
+        return self.thread_state.drive_monitor
+    
+    def run(self, files):
+        """Process an iterable of Drive file records through all stages"""
+        slots = threading.BoundedSemaphore(self.queue_size)
+        results = queue.Queue()
+        in_flight = set()
+        
+        writer = threading.Thread(target=self.write_stage, args=(results, slots, in_flight), daemon=True)
+        writer.start()
+        
+        submitted = 0
+        try:
+            for file_info in files:
+                filename = file_info['name']
+                
+                if file_info['id'] in in_flight:
+                    print(f"Skipping duplicate: {filename}")
+                    continue
+                sheets_manager = self.sheets_manager.for_file(file_info)
+                if sheets_manager.check_duplicate(filename, file_info['id'], revision=file_info.get('modifiedTime')):
+                    print(f"Skipping duplicate: {filename}")
+                    metrics.inc('cv_files_total', status='duplicate')
+                    if not sheets_manager.is_pending(filename, file_info['id']):
+                        self.mark(file_info, WRITTEN)
+                    continue
+                
+                # Blocks once queue_size files are in flight (back-pressure)
+                slots.acquire()
+                in_flight.add(file_info['id'])
+                metrics.set_gauge('cv_queue_depth', len(in_flight), queue='in_flight')
+                submitted += 1
+                
+                print(f"Processing: {filename}")
+                
+                # Cache hits skip the download and parse stages entirely
+                text = self.result_cache.get(file_info.get('md5Checksum'))
+                if text:
+                    print(f"Using cached extraction for: {filename}")
+                    metrics.inc('cv_files_total', status='cached')
+                    results.put((file_info, (None, self.extractor.extract_fields(text, filename)), 'cache'))
+                    continue
+                
+                if exceeds_download_limit(file_info.get('size')):
+                    results.put((file_info, None, 'too_large'))
+                    continue
+                
+                future = self.submit_download(file_info)
+                future.add_done_callback(lambda f, info=file_info: self.on_downloaded(f, info, results))
+        finally:
+            # Drain work already in flight even if listing failed part way
+            results.put(None)
+            writer.join()
+            self.sheets_manager.flush()
+        
+        return submitted
+    
+    def submit_download(self, file_info):
+        if self.async_client:
+            start = time.perf_counter()
+            future = self.async_client.call(self.async_client.client.get_media, file_info['id'])
+            future.add_done_callback(lambda f: self.record_download(f, start))
+            return future
+        return self.download_pool.submit(self.download_stage, file_info)
+    
+    def record_download(self, future, start):
+        if future.exception() is None and future.result():
+            metrics.observe_stage('download', time.perf_counter() - start)
+            metrics.inc('cv_downloaded_bytes_total', len(future.result()))
+    
+    def download_stage(self, file_info):
+        return self.get_drive_monitor().download_bytes(file_info['id'], file_info['name'], file_info.get('size'))
+    
+    def on_downloaded(self, future, file_info, results):
+        if future.exception() is not None:
+            print(f"Error downloading file {file_info['name']}: {future.exception()}")
+        
+        pdf_bytes = future.exception() is None and future.result()
+        if not pdf_bytes:
+            results.put((file_info, None, 'download'))
+            return
+        
+        # Errors raised in a done-callback are only logged by concurrent.futures,
+        # so every failure here must still hand the file to the writer
+        try:
+            self.mark(file_info, DOWNLOADED)
+            pool, parse_future = self.submit_parse(pdf_bytes, file_info['name'])
+        except Exception as e:
+            print(f"Error extracting {file_info['name']}: {e}")
+            results.put((file_info, None, 'extract'))
+            return
+        parse_future.add_done_callback(lambda f: self.on_parsed(f, file_info, results, pdf_bytes, pool))
+    
+    def on_parsed(self, future, file_info, results, pdf_bytes=None, pool=None):
+        if future.exception() is not None:
+            print(f"Error extracting {file_info['name']}: {future.exception()}")
+            if isinstance(future.exception(), BrokenProcessPool) and pool is not None:
+                self.restart_parse_pool(pool)
+            results.put((file_info, None, 'extract'))
+            return
+        
+        result = future.result()
+        if result == NEEDS_OCR:
+            if not self.ocr_stage:
+                results.put((file_info, None, 'extract'))
+                return
+            print(f"Running OCR on: {file_info['name']}")
+            try:
+                ocr_future = self.ocr_stage.submit(pdf_bytes, file_info['name'])
+            except Exception as e:
+                print(f"Error running OCR on {file_info['name']}: {e}")
+                results.put((file_info, None, 'extract'))
+                return
+            ocr_future.add_done_callback(lambda f: self.on_parsed(f, file_info, results))
+            return
+        results.put((file_info, result, 'extract'))
+    
+    def write_stage(self, results, slots, in_flight):
+        """Single writer feeding the sheets manager's batch buffer"""
+        pending = 0
+        done = False
+        while not done or pending:
+            item = results.get()
+            if item is None:
+                done = True
+                pending = len(in_flight)
+                continue
+            
+            file_info, result, stage = item
+            filename = file_info['name']
+            content_hash = file_info.get('md5Checksum')
+            
+            try:
+                if result is None:
+                    if stage == 'too_large':
+                        # The size of this revision cannot change, so it is not retried
+                        print(f"Skipping {filename}: {int(file_info['size'])} bytes exceeds download limit")
+                        self.fail(file_info, "file exceeds MAX_DOWNLOAD_BYTES", retry=False)
+                    else:
+                        failure = 'download' if stage == 'download' else 'extract text'
+                        print(f"Failed to {failure}: {filename}")
+                        self.fail(file_info, f"{failure} failed")
+                    metrics.inc('cv_files_total', status='failed')
+                    metrics.log_event('cv_failed', file=filename, stage=stage)
+                    continue
+                
+                text, extracted_data = result
+                if text:
+                    self.result_cache.put(content_hash, text)
+                    self.mark(file_info, EXTRACTED)
+                
+                sheets_manager = self.sheets_manager.for_file(file_info)
+                if sheets_manager.add_cv_data(extracted_data, filename, file_info['id'], content_hash, self.source,
+                                              file_info.get('modifiedTime')):
+                    print(f"Processed: {filename} - Status: {extracted_data['status']}")
+                    metrics.inc('cv_files_total', status=extracted_data['status'])
+                    metrics.log_event('cv_processed', file=filename, status=extracted_data['status'], via=stage)
+                else:
+                    print(f"Failed to save: {filename}")
+                    self.fail(file_info, "sheet write failed")
+                    metrics.inc('cv_files_total', status='failed')
+                    metrics.log_event('cv_failed', file=filename, stage='write')
+            finally:
+                in_flight.discard(file_info['id'])
+                metrics.set_gauge('cv_queue_depth', len(in_flight), queue='in_flight')
+                slots.release()
+                if done:
+                    pending -= 1
+    
+    def mark(self, file_info, state):
+        if self.job_queue:
+            self.job_queue.mark(file_info['id'], state)
+    
+    def fail(self, file_info, error, retry=True):
+        if self.job_queue:
+            self.job_queue.fail(file_info['id'], error, retry)
+    
+    def close(self):
+        if self.async_client:
+            self.async_client.close()
+        self.download_pool.shutdown(wait=True)
+        self.parse_pool.shutdown(wait=True)
+        self.metrics_queue.put(None)
+        if self.ocr_stage:
+            self.ocr_stage.close()
@@ -0,0 +1,63 @@
+import time
+from datetime import datetime
+import metrics
+import config
+
+def parse_drive_time(value):
+    """Epoch seconds for an RFC 3339 time like 2024-03-01T09:30:00.000Z, or None"""
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+class PollScheduler:
+    """Fixed-rate poll cadence that tightens while files arrive and backs off when idle"""
+    
+    def __init__(self, interval=None, min_interval=None, max_interval=None, backoff=None, adaptive=None):
+        self.min_interval = min_interval or config.POLL_MIN_INTERVAL
+        self.max_interval = max_interval or config.POLL_MAX_INTERVAL
+        self.backoff = backoff or config.POLL_BACKOFF
+        self.adaptive = config.POLL_ADAPTIVE if adaptive is None else adaptive
+        
+        interval = interval or config.POLL_INTERVAL
+        self.interval = min(max(interval, self.min_interval), self.max_interval) if self.adaptive else interval
+        self.next_poll = time.monotonic()
+        metrics.set_gauge('cv_poll_interval_seconds', self.interval)
+    
+    def record(self, new_files):
+        """Adjust the interval after a poll that found new_files and schedule the next poll"""
+        if self.adaptive:
+            if new_files:
+                self.interval = max(self.interval / self.backoff, self.min_interval)
+            else:
+                self.interval = min(self.interval * self.backoff, self.max_interval)
+            metrics.set_gauge('cv_poll_interval_seconds', self.interval)
+        
+        # The next poll is due one interval after this one was due, so the time
+        # spent processing is not added on top of the interval
+        now = time.monotonic()
+        if now < self.next_poll:
+            # A push notification woke this poll early; keep the scheduled one unless it is now too far off
+            self.next_poll = min(self.next_poll, now + self.interval)
+            return
+        self.next_poll += self.interval
+        if self.next_poll < now:
+            # Processing overran: poll now instead of replaying the missed polls back to back
+            self.next_poll = now
+    
+    def time_until_next(self):
+        return max(self.next_poll - time.monotonic(), 0.0)
+    
+    def observe_detection(self, files):
+        """Record how long after upload each file was found; returns the latencies in seconds"""
+        now = time.time()
+        latencies = []
+        for file_info in files:
+            modified = parse_drive_time(file_info.get('modifiedTime'))
+            if modified is None:
+                continue
+            # Drive's clock and ours can disagree by a little
+            latency = max(now - modified, 0.0)
+            metrics.registry.observe('cv_detection_latency_seconds', latency)
+            latencies.append(latency)
+        return latencies
@@ -0,0 +1,145 @@
+import asyncio
+import random
+import threading
+import time
+from googleapiclient.errors import HttpError
+import metrics
+import config
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+
+class TokenBucket:
+    """Thread-safe token bucket that slows down after 429s and recovers on success"""
+    
+    def __init__(self, per_minute):
+        self.max_rate = per_minute / 60.0
+        self.rate = self.max_rate
+        self.capacity = max(1.0, self.max_rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def reserve(self):
+        """Take a token and return how long to wait before using it"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+    
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+    
+    def throttle(self):
+        """Halve the rate after the API pushed back"""
+        with self.lock:
+            self.rate = max(self.max_rate / 16, self.rate / 2)
+    
+    def recover(self):
+        """Creep back towards the configured rate after a success"""
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate * 1.05)
+
+class RateLimiter:
+    """Shared per-API read/write quotas with exponential backoff on 429 and 5xx"""
+    
+    def __init__(self):
+        self.buckets = {
+            ('drive', 'read'): TokenBucket(config.DRIVE_READS_PER_MINUTE),
+            ('drive', 'write'): TokenBucket(config.DRIVE_WRITES_PER_MINUTE),
+            ('sheets', 'read'): TokenBucket(config.SHEETS_READS_PER_MINUTE),
+            ('sheets', 'write'): TokenBucket(config.SHEETS_WRITES_PER_MINUTE),
+        }
+        self.retries = 0
+    
+    def execute(self, api, kind, request, idempotent=True):
+        """Execute a googleapiclient request under the quota"""
+        return self.call(api, kind, request.execute, idempotent=idempotent)
+    
+    def call(self, api, kind, func, *args, idempotent=True, **kwargs):
+        """Call func under the quota, retrying rate-limit and server errors"""
+        bucket = self.buckets[(api, kind)]
+        attempt = 0
+        while True:
+            bucket.acquire()
+            metrics.inc('cv_api_requests_total', api=api, kind=kind)
+            try:
+                result = func(*args, **kwargs)
+                bucket.recover()
+                return result
+            except HttpError as e:
+                delay = self.retry_delay(e.resp.status, e.resp.get('retry-after'), e.content, attempt, idempotent)
+                if delay is None:
+                    raise
+                self.note_retry(bucket, api, e.resp.status, delay)
+                time.sleep(delay)
+                attempt += 1
+    
+    async def call_async(self, api, kind, func, status_of, *args, idempotent=True, **kwargs):
+        """Async variant; status_of maps an exception to (status, retry_after, content) or None"""
+        bucket = self.buckets[(api, kind)]
+        attempt = 0
+        while True:
+            wait = bucket.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            metrics.inc('cv_api_requests_total', api=api, kind=kind)
+            try:
+                result = await func(*args, **kwargs)
+                bucket.recover()
+                return result
+            except Exception as e:
+                details = status_of(e)
+                delay = self.retry_delay(*details, attempt, idempotent) if details else None
+                if delay is None:
+                    raise
+                self.note_retry(bucket, api, details[0], delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+    
+    def retry_delay(self, status, retry_after, content, attempt, idempotent=True):
+        """Seconds to wait before retrying, or None if the error is final"""
+        if attempt >= config.API_MAX_RETRIES:
+            return None
+        
+        if isinstance(content, bytes):
+            content = content.decode('utf-8', 'replace')
+        rate_limited = status == 429 or (status == 403 and any(r in (content or '') for r in RATE_LIMIT_REASONS))
+        if status not in RETRYABLE_STATUS and not rate_limited:
+            return None
+        # A 5xx on a write may still have been applied; let the caller decide
+        if not rate_limited and not idempotent:
+            return None
+        
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(config.API_MAX_BACKOFF, config.API_BASE_BACKOFF * 2 ** attempt))
+    
+    def note_retry(self, bucket, api, status, delay):
+        if status in (429, 403):
+            bucket.throttle()
+        self.retries += 1
+        metrics.inc('cv_api_retries_total', api=api, status=str(status))
+        print(f"{api} API returned {status}, retrying in {delay:.1f}s")
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_rate_limiter():
+    """Process-wide limiter shared by every Drive and Sheets caller"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+        return _limiter
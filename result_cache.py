@@ -0,0 +1,66 @@
+import sqlite3
+import threading
+import time
+import config
+
+class ResultCache:
+    """Size-bounded LRU store of extracted PDF text, keyed by content hash"""
+    
+    def __init__(self, path=None, max_bytes=None):
+        self.path = path or config.RESULT_CACHE_FILE
+        self.max_bytes = max_bytes or config.RESULT_CACHE_MAX_BYTES
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "content_hash TEXT PRIMARY KEY, text TEXT, size INTEGER, last_used REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON results(last_used)")
+        self.conn.commit()
+    
+    def get(self, content_hash):
+        """Return cached text for a content hash, or None"""
+        if not content_hash:
+            return None
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT text FROM results WHERE content_hash = ?", (content_hash,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE results SET last_used = ? WHERE content_hash = ?", (time.time(), content_hash)
+            )
+            self.conn.commit()
+            return row[0]
+    
+    def put(self, content_hash, text):
+        """Store extracted text and evict least recently used entries over the size cap"""
+        if not content_hash or not text:
+            return
+        size = len(text.encode('utf-8'))
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results (content_hash, text, size, last_used) VALUES (?, ?, ?, ?)",
+                (content_hash, text, size, time.time())
+            )
+            self.evict()
+            self.conn.commit()
+    
+    def evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        
+        rows = self.conn.execute("SELECT content_hash, size FROM results ORDER BY last_used").fetchall()
+        expired = []
+        for content_hash, size in rows:
+            if total <= self.max_bytes:
+                break
+            expired.append((content_hash,))
+            total -= size
+        self.conn.executemany("DELETE FROM results WHERE content_hash = ?", expired)
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
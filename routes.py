@@ -0,0 +1,89 @@
+import json
+import os
+from duplicate_index import DuplicateIndex
+from sheets_manager import SheetsManager
+import config
+
+class Route:
+    """One team's Drive folder and the spreadsheet its CVs are written to"""
+    
+    def __init__(self, name, folder_id, spreadsheet_id, sheet_name=None):
+        self.name = name
+        self.folder_id = folder_id
+        self.spreadsheet_id = spreadsheet_id
+        self.sheet_name = sheet_name or config.SHEET_NAME
+
+def load_routes(path=None):
+    """Read routes from a JSON list of {"name", "folder_id", "spreadsheet_id", "sheet_name"} objects"""
+    path = path or config.ROUTES_FILE
+    with open(path) as f:
+        entries = json.load(f)
+    
+    routes = []
+    for entry in entries:
+        missing = [key for key in ('name', 'folder_id', 'spreadsheet_id') if not entry.get(key)]
+        if missing:
+            raise ValueError(f"Route {entry} in {path} is missing {', '.join(missing)}")
+        routes.append(Route(entry['name'], entry['folder_id'], entry['spreadsheet_id'], entry.get('sheet_name')))
+    
+    for attr in ('name', 'folder_id'):
+        values = [getattr(route, attr) for route in routes]
+        if len(set(values)) != len(values):
+            raise ValueError(f"Routes in {path} must have unique {attr} values")
+    return routes
+
+def state_path(path, route_name):
+    """Per-route copy of a local state file, e.g. duplicate_index.team-a.db"""
+    base, ext = os.path.splitext(path)
+    return f"{base}.{route_name}{ext}"
+
+def fair_order(files, route_names):
+    """Interleave files round-robin by route so one team's backlog does not hold up the others"""
+    queues = {}
+    for file_info in files:
+        route = file_info.get('route')
+        if route not in route_names:
+            print(f"Skipping {file_info['name']}: no route for it")
+            continue
+        queues.setdefault(route, []).append(file_info)
+    
+    ordered = []
+    for position in range(max((len(queue) for queue in queues.values()), default=0)):
+        for queue in queues.values():
+            if position < len(queue):
+                ordered.append(queue[position])
+    return ordered
+
+class RoutedSheets:
+    """A SheetsManager per route, each with its own buffer and duplicate index"""
+    
+    def __init__(self, routes, buffered=None, sheets_service=None, job_queue=None):
+        self.folder_routes = {route.folder_id: route.name for route in routes}
+        self.managers = {}
+        for route in routes:
+            self.managers[route.name] = SheetsManager(
+                buffered=buffered, sheets_service=sheets_service, job_queue=job_queue,
+                spreadsheet_id=route.spreadsheet_id, sheet_name=route.sheet_name,
+                duplicate_index=DuplicateIndex(state_path(config.DUPLICATE_INDEX_FILE, route.name))
+            )
+    
+    def tag(self, files):
+        """Set each Drive file's route from its parent folder"""
+        for file_info in files:
+            for parent in file_info.get('parents', []):
+                if parent in self.folder_routes:
+                    file_info['route'] = self.folder_routes[parent]
+                    break
+            yield file_info
+    
+    def for_file(self, file_info):
+        return self.managers[file_info['route']]
+    
+    def flush_if_due(self):
+        return all([manager.flush_if_due() for manager in self.managers.values()])
+    
+    def flush(self):
+        return all([manager.flush() for manager in self.managers.values()])
+    
+    def reconcile_duplicate_index(self):
+        return all([manager.reconcile_duplicate_index() for manager in self.managers.values()])
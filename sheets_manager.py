@@ -1,84 +1,400 @@
+import re
+import threading
+import time
 from datetime import datetime
-from google_auth import get_google_service
+from google_auth import LazyService
+from duplicate_index import DuplicateIndex
+from job_queue import WRITTEN
+from rate_limiter import get_rate_limiter
+import metrics
 import config
 
+HEADERS = ['Name', 'Email', 'Phone', 'Filename', 'Timestamp', 'Source', 'Status']
+
+# Hidden columns H:I identify the Drive file and revision behind each row
+KEY_HEADERS = ['File ID', 'Revision']
+SHEET_HEADERS = HEADERS + KEY_HEADERS
+
 class SheetsManager:
-    def __init__(self):
-        self.sheets_service = get_google_service('sheets', 'v4')
+    def __init__(self, buffered=None, sheets_service=None, job_queue=None, spreadsheet_id=None, sheet_name=None,
+                 duplicate_index=None):
+        self.sheets_service = sheets_service or LazyService('sheets', 'v4')
+        self.spreadsheet_id = spreadsheet_id or config.SPREADSHEET_ID
+        self.sheet_name = sheet_name or config.SHEET_NAME
+        self.duplicate_index = duplicate_index or DuplicateIndex()
+        self.limiter = get_rate_limiter()
+        self.job_queue = job_queue
+        
+        # Buffered writer state; entries with a row number are in-place updates
+        self.buffered = config.SHEETS_BUFFERED if buffered is None else buffered
+        self.pending_rows = []
+        self.flush_uncertain = False
+        self.last_flush = time.time()
+        # Unbuffered writes that failed but may still have reached the sheet, by file ID or filename
+        self.uncertain_writes = set()
+        self.write_lock = threading.RLock()
+        
         self.setup_sheet()
+        self.warm_duplicate_index()
     
     def setup_sheet(self):
         """Create sheet and headers if needed"""
         try:
+            # On restarts the sheet is already set up; one read confirms it
+            if self.has_headers():
+                return
+            
             # Try to create the sheet first
+            sheet_id = None
             try:
-                self.sheets_service.spreadsheets().batchUpdate(
-                    spreadsheetId=config.SPREADSHEET_ID,
+                response = self.limiter.execute('sheets', 'write', self.sheets_service.spreadsheets().batchUpdate(
+                    spreadsheetId=self.spreadsheet_id,
                     body={
                         'requests': [{
                             'addSheet': {
                                 'properties': {
-                                    'title': config.SHEET_NAME
+                                    'title': self.sheet_name
                                 }
                             }
                         }]
                     }
-                ).execute()
-                print(f"Created sheet: {config.SHEET_NAME}")
+                ))
+                sheet_id = response['replies'][0]['addSheet']['properties']['sheetId']
+                print(f"Created sheet: {self.sheet_name}")
             except:
                 pass  # Sheet already exists
             
             # Add headers
-            headers = [['Name', 'Email', 'Phone', 'Filename', 'Timestamp', 'Source', 'Status']]
-            self.sheets_service.spreadsheets().values().update(
-                spreadsheetId=config.SPREADSHEET_ID,
-                range=f"{config.SHEET_NAME}!A1:G1",
+            self.limiter.execute('sheets', 'write', self.sheets_service.spreadsheets().values().update(
+                spreadsheetId=self.spreadsheet_id,
+                range=f"{self.sheet_name}!A1:I1",
                 valueInputOption='RAW',
-                body={'values': headers}
-            ).execute()
+                body={'values': [SHEET_HEADERS]}
+            ))
+            self.hide_key_columns(sheet_id)
             print("Sheet setup complete")
         except Exception as e:
             print(f"Error setting up sheet: {e}")
             print("Make sure to share the Google Sheet with: cvdata@cvdata-479407.iam.gserviceaccount.com")
     
-    def add_cv_data(self, extracted_data, filename):
-        """Add CV data to sheet"""
+    def has_headers(self):
         try:
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            row_data = [[
-                extracted_data.get('name', ''),
-                extracted_data.get('email', ''),
-                extracted_data.get('phone', ''),
-                filename,
-                timestamp,
-                'Google Drive',
-                extracted_data.get('status', 'success')
-            ]]
-            
-            self.sheets_service.spreadsheets().values().append(
-                spreadsheetId=config.SPREADSHEET_ID,
-                range=f"{config.SHEET_NAME}!A:G",
+            result = self.limiter.execute('sheets', 'read', self.sheets_service.spreadsheets().values().get(
+                spreadsheetId=self.spreadsheet_id,
+                range=f"{self.sheet_name}!A1:I1"
+            ))
+        except Exception:
+            return False  # Sheet does not exist yet
+        return result.get('values', [[]])[0] == SHEET_HEADERS
+    
+    def hide_key_columns(self, sheet_id=None):
+        """Hide the file ID and revision columns from people reading the sheet"""
+        if sheet_id is None:
+            spreadsheet = self.limiter.execute('sheets', 'read', self.sheets_service.spreadsheets().get(
+                spreadsheetId=self.spreadsheet_id,
+                fields='sheets.properties(sheetId,title)'
+            ))
+            sheet_id = next(sheet['properties']['sheetId'] for sheet in spreadsheet.get('sheets', [])
+                            if sheet['properties']['title'] == self.sheet_name)
+        
+        self.limiter.execute('sheets', 'write', self.sheets_service.spreadsheets().batchUpdate(
+            spreadsheetId=self.spreadsheet_id,
+            body={
+                'requests': [{
+                    'updateDimensionProperties': {
+                        'range': {
+                            'sheetId': sheet_id,
+                            'dimension': 'COLUMNS',
+                            'startIndex': len(HEADERS),
+                            'endIndex': len(SHEET_HEADERS)
+                        },
+                        'properties': {'hiddenByUser': True},
+                        'fields': 'hiddenByUser'
+                    }
+                }]
+            }
+        ))
+    
+    def for_file(self, file_info):
+        """The manager that writes this file's row; see RoutedSheets for several sheets"""
+        return self
+    
+    @staticmethod
+    def build_row(extracted_data, filename, source='Google Drive', file_id=None, revision=None):
+        """Build a sheet row from extracted fields"""
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        return [
+            extracted_data.get('name', ''),
+            extracted_data.get('email', ''),
+            extracted_data.get('phone', ''),
+            filename,
+            timestamp,
+            source,
+            extracted_data.get('status', 'success'),
+            file_id or '',
+            revision or ''
+        ]
+    
+    def append_rows(self, rows):
+        """Append rows to the sheet in a single request; returns the first row number written"""
+        with metrics.timer('write'):
+            response = self.limiter.execute('sheets', 'write', self.sheets_service.spreadsheets().values().append(
+                spreadsheetId=self.spreadsheet_id,
+                range=f"{self.sheet_name}!A:I",
                 valueInputOption='RAW',
                 insertDataOption='INSERT_ROWS',
-                body={'values': row_data}
-            ).execute()
-            
+                body={'values': rows}
+            ), idempotent=False)
+        
+        # e.g. "CV_Data!A12:I14"
+        match = re.search(r'![A-Z]+(\d+)', response.get('updates', {}).get('updatedRange', ''))
+        return int(match.group(1)) if match else None
+    
+    def update_rows(self, updates):
+        """Overwrite rows in place with one values.batchUpdate; updates are (row number, row) pairs"""
+        with metrics.timer('write'):
+            self.limiter.execute('sheets', 'write', self.sheets_service.spreadsheets().values().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={
+                    'valueInputOption': 'RAW',
+                    'data': [{'range': f"{self.sheet_name}!A{number}:I{number}", 'values': [row]}
+                             for number, row in updates]
+                }
+            ))
+    
+    def add_cv_data(self, extracted_data, filename, file_id=None, content_hash=None, source='Google Drive',
+                    revision=None):
+        """Add CV data to sheet, or queue it when buffering; a new revision of a file replaces its row"""
+        entry = {
+            'row': self.build_row(extracted_data, filename, source, file_id, revision),
+            'filename': filename,
+            'file_id': file_id,
+            'content_hash': content_hash,
+            'revision': revision,
+            'row_number': self.duplicate_index.row_for(file_id) if file_id else None
+        }
+        
+        # Updates are always queued and sent together at the next flush
+        if self.buffered or entry['row_number']:
+            with self.write_lock:
+                self.pending_rows.append(entry)
+                metrics.set_gauge('cv_queue_depth', len(self.pending_rows), queue='sheets_buffer')
+            if self.buffered:
+                self.flush_if_due()
+            return True
+        
+        key = file_id or filename
+        try:
+            # A failed append may have been applied, so check the sheet before writing it again
+            if key in self.uncertain_writes and not self.split_written([entry]):
+                self.uncertain_writes.discard(key)
+                return True
+            row_number = self.append_rows([entry['row']])
+            self.uncertain_writes.discard(key)
+            self.record_written(filename, file_id, content_hash, row_number, revision)
             return True
         except Exception as e:
+            self.uncertain_writes.add(key)
             print(f"Error adding data to sheet: {e}")
             return False
     
-    def check_duplicate(self, filename):
-        """Check if filename already exists"""
-        try:
-            result = self.sheets_service.spreadsheets().values().get(
-                spreadsheetId=config.SPREADSHEET_ID,
-                range=f"{config.SHEET_NAME}!D:D"
-            ).execute()
+    def record_written(self, filename, file_id=None, content_hash=None, row_number=None, revision=None):
+        """Note a row that has reached the sheet"""
+        self.duplicate_index.add(filename, file_id, content_hash, row_number, revision)
+        if self.job_queue and file_id:
+            self.job_queue.mark(file_id, WRITTEN)
+    
+    def flush_if_due(self):
+        """Flush buffered rows once the size or time threshold is reached"""
+        with self.write_lock:
+            if not self.pending_rows:
+                return True
+            full = len(self.pending_rows) >= config.SHEETS_BATCH_SIZE
+            stale = time.time() - self.last_flush >= config.SHEETS_FLUSH_INTERVAL
+            if self.buffered and not (full or stale):
+                return True
+        return self.flush()
+    
+    def flush(self):
+        """Write all buffered rows: one batchUpdate for changed files, one append for new ones"""
+        with self.write_lock:
+            if not self.pending_rows:
+                return True
             
-            filenames = [row[0] for row in result.get('values', []) if row]
-            return filename in filenames
+            try:
+                # A previous append may have reached the sheet before failing,
+                # so drop rows that are already there instead of writing them twice
+                if self.flush_uncertain:
+                    self.drop_written_rows()
+                    if not self.pending_rows:
+                        self.flush_uncertain = False
+                        return True
+                
+                batch = list(self.pending_rows)
+                updates = [entry for entry in batch if entry['row_number']]
+                appends = [entry for entry in batch if not entry['row_number']]
+                
+                # Rows may have moved since they were indexed; updates never
+                # overwrite a row that belongs to another file
+                if updates:
+                    updates, moved = self.verify_rows(updates)
+                    appends += moved
+                    self.update_rows([(entry['row_number'], entry['row']) for entry in updates])
+                first_row = self.append_rows([entry['row'] for entry in appends]) if appends else None
+            except Exception as e:
+                self.flush_uncertain = True
+                print(f"Error flushing {len(self.pending_rows)} rows to sheet: {e}")
+                return False
+            
+            for entry in updates:
+                self.record_written(entry['filename'], entry['file_id'], entry['content_hash'],
+                                    entry['row_number'], entry['revision'])
+            for offset, entry in enumerate(appends):
+                row_number = first_row + offset if first_row else None
+                self.record_written(entry['filename'], entry['file_id'], entry['content_hash'],
+                                    row_number, entry['revision'])
+            
+            self.pending_rows = self.pending_rows[len(batch):]
+            metrics.set_gauge('cv_queue_depth', len(self.pending_rows), queue='sheets_buffer')
+            self.flush_uncertain = False
+            self.last_flush = time.time()
+            if updates:
+                print(f"Updated {len(updates)} rows in place")
+            if appends:
+                print(f"Flushed {len(appends)} rows to sheet")
+            return True
+    
+    def verify_rows(self, updates):
+        """Split updates into those whose row still holds the file and those to append"""
+        ranges = [f"{self.sheet_name}!H{entry['row_number']}" for entry in updates]
+        result = self.limiter.execute('sheets', 'read', self.sheets_service.spreadsheets().values().batchGet(
+            spreadsheetId=self.spreadsheet_id,
+            ranges=ranges
+        ))
+        cells = [value_range.get('values', [['']])[0][0] for value_range in result.get('valueRanges', [])]
+        if cells == [entry['file_id'] for entry in updates]:
+            return updates, []
+        
+        # Rows were inserted, sorted or deleted by hand: relocate them from the sheet
+        print("Sheet rows have moved, re-reading row numbers")
+        rows = {file_id: number for number, _, file_id, _ in self.read_sheet_index() if file_id}
+        verified, moved = [], []
+        for entry in updates:
+            entry['row_number'] = rows.get(entry['file_id'])
+            (verified if entry['row_number'] else moved).append(entry)
+        return verified, moved
+    
+    def drop_written_rows(self):
+        """Mark pending rows that already exist in the sheet as written"""
+        self.pending_rows = self.split_written(self.pending_rows)
+    
+    def split_written(self, entries):
+        """Record entries already in the sheet as written and return the rest"""
+        rows = self.read_sheet_index()
+        by_file_id = {file_id: (number, revision) for number, _, file_id, revision in rows if file_id}
+        by_filename = {filename for _, filename, file_id, _ in rows if not file_id}
+        
+        remaining = []
+        for entry in entries:
+            written = by_file_id.get(entry['file_id'])
+            if written and written[1] == (entry['revision'] or ''):
+                self.record_written(entry['filename'], entry['file_id'], entry['content_hash'],
+                                    written[0], entry['revision'])
+            elif not entry['file_id'] and entry['filename'] in by_filename:
+                self.record_written(entry['filename'])
+            else:
+                remaining.append(entry)
+        return remaining
+    
+    def is_pending(self, filename, file_id=None):
+        """Check if file is waiting in the write buffer"""
+        with self.write_lock:
+            return any(
+                entry['file_id'] == file_id if file_id else entry['filename'] == filename
+                for entry in self.pending_rows
+            )
+    
+    def read_rows(self):
+        """Read every data row as (row number, values)"""
+        result = self.limiter.execute('sheets', 'read', self.sheets_service.spreadsheets().values().get(
+            spreadsheetId=self.spreadsheet_id,
+            range=f"{self.sheet_name}!A2:I"
+        ))
+        
+        # Trailing empty cells are omitted, so pad every row to full width
+        return [(number, values + [''] * (len(SHEET_HEADERS) - len(values)))
+                for number, values in enumerate(result.get('values', []), start=2)]
+    
+    def read_sheet_index(self):
+        """Read (row number, filename, file ID, revision) for every row in the sheet"""
+        result = self.limiter.execute('sheets', 'read', self.sheets_service.spreadsheets().values().get(
+            spreadsheetId=self.spreadsheet_id,
+            range=f"{self.sheet_name}!D2:I"
+        ))
+        
+        entries = []
+        for number, values in enumerate(result.get('values', []), start=2):
+            values = values + [''] * (6 - len(values))
+            if values[0]:
+                entries.append((number, values[0], values[4], values[5]))
+        return entries
+    
+    def warm_duplicate_index(self):
+        """Load sheet rows into the local index once at startup"""
+        if self.duplicate_index.count() > 0:
+            return
+        self.reconcile_duplicate_index()
+    
+    def reconcile_duplicate_index(self):
+        """Resync the local duplicate index and row numbers against the sheet"""
+        try:
+            added, removed = self.duplicate_index.reconcile(self.read_sheet_index())
+            print(f"Duplicate index reconciled: {added} added, {removed} removed")
+            return True
         except Exception as e:
-            print(f"Error checking duplicates: {e}")
-            return False
\ No newline at end of file
+            print(f"Error reconciling duplicate index: {e}")
+            return False
+    
+    def check_duplicate(self, filename, file_id=None, content_hash=None, revision=None):
+        """Check if file was already written or queued, using the local index"""
+        with metrics.timer('dedupe'):
+            if self.is_pending(filename, file_id):
+                return True
+            return self.duplicate_index.contains(filename, file_id, content_hash, revision)
+    
+    def reextract_manual_review(self, result_cache, extractor):
+        """Re-run field extraction on manual_review rows from cached text and update them in place"""
+        rows = [(number, values) for number, values in self.read_rows() if values[6] == 'manual_review']
+        updated = improved = skipped = 0
+        
+        with self.write_lock:
+            cached = []
+            for number, values in rows:
+                file_id = values[7]
+                content_hash = self.duplicate_index.content_hash_for(file_id) if file_id else None
+                text = result_cache.get(content_hash)
+                if not text:
+                    skipped += 1
+                    continue
+                cached.append((number, values, content_hash, text))
+            
+            # Cached texts are re-extracted together so repeated lines are judged once
+            texts = [text for _, _, _, text in cached]
+            results = extractor.extract_fields_batch(texts, [values[3] for _, values, _, _ in cached])
+            for (number, values, content_hash, _), extracted_data in zip(cached, results):
+                filename, source, file_id, revision = values[3], values[5], values[7], values[8]
+                self.pending_rows.append({
+                    'row': self.build_row(extracted_data, filename, source, file_id, revision),
+                    'filename': filename,
+                    'file_id': file_id,
+                    'content_hash': content_hash,
+                    'revision': revision,
+                    'row_number': number
+                })
+                updated += 1
+                improved += extracted_data['status'] != 'manual_review'
+            
+            if updated and not self.flush():
+                return 0, 0, skipped
+        return updated, improved, skipped
@@ -0,0 +1,50 @@
+"""Shared setup for tests that run against the in-process stub Drive and Sheets services"""
+import os
+import tempfile
+import rate_limiter
+import config
+from benchmarks.stub_services import StubBackend, StubHttp, build_services
+
+def use_temp_state(test):
+    """Point every local state file at a fresh temp directory and lift the API quotas"""
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+    for name, filename in (('DUPLICATE_INDEX_FILE', 'duplicate_index.db'), ('JOB_QUEUE_FILE', 'job_queue.db'),
+                           ('RESULT_CACHE_FILE', 'result_cache.db'), ('DRIVE_PAGE_TOKEN_FILE', 'page_token.txt'),
+                           ('BACKFILL_CHECKPOINT_FILE', 'backfill_checkpoint.txt')):
+        patch_config(test, name, os.path.join(directory.name, filename))
+    for api in ('DRIVE', 'SHEETS'):
+        patch_config(test, f'{api}_READS_PER_MINUTE', 10 ** 9)
+        patch_config(test, f'{api}_WRITES_PER_MINUTE', 10 ** 9)
+    patch_config(test, 'API_BASE_BACKOFF', 0.0)
+    patch_config(test, 'SPREADSHEET_ID', 'sheet')
+    patch_config(test, 'DRIVE_FOLDER_ID', 'folder')
+    
+    # The limiter is process-wide; rebuild it with the lifted quotas
+    rate_limiter._limiter = None
+    test.addCleanup(setattr, rate_limiter, '_limiter', None)
+    return directory.name
+
+def patch_config(test, name, value):
+    test.addCleanup(setattr, config, name, getattr(config, name))
+    setattr(config, name, value)
+
+def stub_services(corpus=()):
+    """A fresh stub backend and the (drive, sheets) services that talk to it"""
+    backend = StubBackend(list(corpus))
+    return (backend,) + build_services(backend)
+
+def fail_after_sheet_writes(test, backend, path_suffix, count=1, status=503):
+    """Apply the next count Sheets requests ending in path_suffix, then answer them with an error"""
+    original = StubHttp.sheets
+    remaining = [count]
+    
+    def sheets(self, path, method, body, query):
+        response = original(self, path, method, body, query)
+        if self.backend is backend and path.endswith(path_suffix) and remaining[0] > 0:
+            remaining[0] -= 1
+            return self.respond(status, {'error': {'code': status, 'message': 'injected after the write'}})
+        return response
+    
+    StubHttp.sheets = sheets
+    test.addCleanup(setattr, StubHttp, 'sheets', original)
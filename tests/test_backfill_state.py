@@ -0,0 +1,33 @@
+"""Backfill progress is kept per watched folder, so switching folders on one job queue backfills the new one"""
+import unittest
+from main import CVProcessor
+from benchmarks.corpus import generate_corpus
+from benchmarks.stub_services import StubBackend, build_services
+from tests.support import use_temp_state, patch_config
+
+class BackfillStateTest(unittest.TestCase):
+    def setUp(self):
+        use_temp_state(self)
+        self.backend = StubBackend(generate_corpus(6), folder_ids=['folder', 'other'])
+        self.drive, self.sheets = build_services(self.backend)
+    
+    def backfill(self, folder_id):
+        patch_config(self, 'DRIVE_FOLDER_ID', folder_id)
+        processor = CVProcessor(self.drive, self.sheets)
+        processor.process_all_existing()
+        return processor
+    
+    def test_new_folder_is_backfilled(self):
+        self.backfill('folder')
+        self.assertEqual(len(self.backend.rows), 3)
+        self.backfill('other')
+        self.assertEqual(len(self.backend.rows), 6)
+    
+    def test_same_folder_is_not_listed_again(self):
+        self.backfill('folder')
+        listings = self.backend.calls['files.list']
+        self.backfill('folder')
+        self.assertEqual(self.backend.calls['files.list'], listings)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+"""batch.upload keys rows by File ID, so batch rows and Drive files with the same name stay apart"""
+import unittest
+from batch import upload, row_key
+from duplicate_index import DuplicateIndex
+from sheets_manager import SheetsManager
+from tests.support import use_temp_state, stub_services
+
+class BatchUploadTest(unittest.TestCase):
+    def setUp(self):
+        use_temp_state(self)
+        self.backend, _, sheets = stub_services()
+        self.index = DuplicateIndex()
+        self.addCleanup(self.index.close)
+        self.sheets_manager = SheetsManager(buffered=False, sheets_service=sheets, duplicate_index=self.index)
+    
+    def batch_row(self, filename, pdf_bytes):
+        return SheetsManager.build_row({'name': 'Salma Benali'}, filename, 'Batch Import', row_key(pdf_bytes))
+    
+    def test_same_name_as_drive_row_is_uploaded(self):
+        self.sheets_manager.add_cv_data({'name': 'Jean Dupont'}, 'CV.pdf', 'drive1', revision='r1')
+        upload([self.batch_row('CV.pdf', b'batch pdf')], self.sheets_manager)
+        self.assertEqual(len(self.backend.rows), 2)
+    
+    def test_drive_upload_is_not_shadowed_by_batch_row(self):
+        upload([self.batch_row('Resume.pdf', b'batch pdf')], self.sheets_manager)
+        self.assertFalse(self.sheets_manager.check_duplicate('Resume.pdf', 'driveB', revision='r9'))
+    
+    def test_repeats_within_and_across_imports_are_written_once(self):
+        rows = [self.batch_row('a.pdf', b'same pdf'), self.batch_row('copy of a.pdf', b'same pdf'),
+                self.batch_row('b.pdf', b'other pdf')]
+        upload(rows, self.sheets_manager)
+        upload(rows, self.sheets_manager)
+        self.assertEqual([row[3] for row in self.backend.rows], ['a.pdf', 'b.pdf'])
+        self.assertEqual(self.backend.rows[0][7], row_key(b'same pdf'))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""PDFExtractor field extraction must return exactly what the original implementation did
+
+Run from the repository root:
+    python -m pytest tests
+"""
+import random
+import unittest
+from pdf_extractor import PDFExtractor
+from tests.reference_extractor import ReferenceExtractor
+
+NAMES = ['YOUSSEF EL AMRANI', 'Salma Benali', 'Mr John Smith', 'fatima-zahra alaoui', 'Dr. Amine Tazi',
+         'KHADIJA', 'Jean Dupont', 'A B', 'Omar Said Idrissi Alami Berrada']
+LABELS = ['Name: ', 'Full Name: ', 'candidate name:', '', '', '']
+HEADERS = ['EXPERIENCES PROFESSIONNELLES', 'Formation', 'Skills', 'Curriculum Vitae', 'Contact Details',
+           'Profile', 'Software Engineer', 'Langues', 'Projects - CV']
+WORDS = ['Python', 'SQL', 'Rabat', 'Casablanca', 'Master', 'Tel', 'Email:', 'GSM', 'Fax', 'Adresse', '2019', '-', '|',
+         'ſ', 'K', 'Université', 'resume', 'Cv']
+LOCAL_PARTS = ['youssef.amrani', 'salma_b', 'j-smith', 'a', '.x.', 'A.B-C_D', '']
+DOMAINS = ['gmail.com', 'indeedemail.com', 'outlook.fr', 'company.co.ma', 'x', 'mail.c', 'b@gmail.com', '-.io']
+PREFIXES = ['+212', '212', '0', '00212', '+33', '']
+SEPARATORS = ['', '', ' ', '-', '.', '  ', ' - ', '\n']
+
+def random_number(rng):
+    digits = ''.join(rng.choice('0123456789') for _ in range(8))
+    number = rng.choice(PREFIXES) + rng.choice('5671') + digits[:rng.choice([8, 8, 7, 6])]
+    if rng.random() < 0.5:
+        return number
+    # The same number with separators between some of its digits
+    return ''.join(digit + (rng.choice(SEPARATORS) if rng.random() < 0.4 else '') for digit in number)
+
+def random_phone(rng):
+    """One or more numbers and digit fragments, so spaced and compact candidates overlap"""
+    parts = []
+    for _ in range(rng.randint(1, 3)):
+        if rng.random() < 0.7:
+            parts.append(random_number(rng))
+        else:
+            parts.append(''.join(rng.choice('0567 ') for _ in range(rng.randint(1, 4))))
+    return rng.choice(SEPARATORS).join(parts)
+
+def random_line(rng):
+    kind = rng.random()
+    if kind < 0.15:
+        return rng.choice(LABELS) + rng.choice(NAMES)
+    if kind < 0.3:
+        return rng.choice(HEADERS)
+    if kind < 0.5:
+        return f"{rng.choice(['Email: ', '', 'mail '])}{rng.choice(LOCAL_PARTS)}@{rng.choice(DOMAINS)}"
+    if kind < 0.75:
+        return f"{rng.choice(['Tel ', 'Phone: ', '', 'GSM '])}{random_phone(rng)}"
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 8)))
+
+def random_document(rng):
+    lines = [random_line(rng) for _ in range(rng.randint(0, 25))]
+    text = '\n'.join(line if rng.random() < 0.8 else f"  {line}\n" for line in lines)
+    filename = rng.choice(['', 'CV_Salma_Benali.pdf', 'resume-john-smith.PDF', 'scan_001.pdf', 'Amine Tazi CV.pdf'])
+    return text, filename
+
+class FieldExtractionTest(unittest.TestCase):
+    cases = 20000
+    
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(9)
+        cls.documents = [random_document(rng) for _ in range(cls.cases)]
+        cls.reference = ReferenceExtractor()
+        cls.extractor = PDFExtractor()
+    
+    def assert_matches_reference(self, text, filename, result):
+        self.assertEqual(result, self.reference.extract_fields(text, filename), f"text={text!r} filename={filename!r}")
+    
+    def test_known_cases(self):
+        # A spaced number must not swallow a compact mobile number found by its own pass
+        for text in ["Tel 0 5 0612345678", "a@b@gmail.com x.y@z.co.uk", "0612345678 +212 5 22 33 44 55",
+                     "SALMA BENALI\nName: Jean Dupont", ""]:
+            self.assert_matches_reference(text, '', self.extractor.extract_fields(text, ''))
+    
+    def test_extract_fields_matches_reference(self):
+        for text, filename in self.documents:
+            self.assert_matches_reference(text, filename, self.extractor.extract_fields(text, filename))
+    
+    def test_extract_fields_batch_matches_reference(self):
+        texts = [text for text, _ in self.documents]
+        filenames = [filename for _, filename in self.documents]
+        for text, filename, result in zip(texts, filenames, self.extractor.extract_fields_batch(texts, filenames)):
+            self.assert_matches_reference(text, filename, result)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""Job lifecycle: discovered -> downloaded -> extracted -> written, with retries and dead-lettering"""
+import time
+import unittest
+from job_queue import JobQueue, DISCOVERED, DOWNLOADED, EXTRACTED, WRITTEN, FAILED
+from tests.support import use_temp_state
+
+def drive_file(file_id, modified='2024-01-01T00:00:00.000Z', name='CV.pdf'):
+    return {'id': file_id, 'name': name, 'md5Checksum': f"md5-{file_id}", 'size': '100', 'modifiedTime': modified}
+
+class JobQueueTest(unittest.TestCase):
+    def setUp(self):
+        use_temp_state(self)
+        self.queue = JobQueue(max_attempts=3, retry_delay=60)
+        self.addCleanup(self.queue.close)
+    
+    def state(self, file_id):
+        return self.queue.conn.execute("SELECT state FROM jobs WHERE file_id = ?", (file_id,)).fetchone()[0]
+    
+    def test_states_advance_until_written(self):
+        self.assertTrue(self.queue.enqueue(drive_file('a')))
+        self.assertEqual(self.state('a'), DISCOVERED)
+        for state in (DOWNLOADED, EXTRACTED):
+            self.queue.mark('a', state)
+            self.assertEqual(self.state('a'), state)
+            self.assertEqual([job['id'] for job in self.queue.pending()], ['a'])
+        
+        self.queue.mark('a', WRITTEN)
+        self.assertEqual(self.queue.pending(), [])
+        self.assertEqual(self.queue.counts(), {WRITTEN: 1})
+    
+    def test_same_revision_is_tracked_once(self):
+        files = [drive_file('a'), drive_file('b')]
+        self.assertEqual([f['id'] for f in self.queue.track(files)], ['a', 'b'])
+        self.queue.mark('a', WRITTEN)
+        self.assertEqual(list(self.queue.track(files)), [])
+        self.assertEqual(self.state('a'), WRITTEN)
+    
+    def test_new_revision_starts_over(self):
+        self.queue.enqueue(drive_file('a'))
+        self.queue.fail('a', "download failed")
+        self.queue.mark('a', WRITTEN)
+        
+        self.assertTrue(self.queue.enqueue(drive_file('a', modified='2024-02-01T00:00:00.000Z')))
+        self.assertEqual(self.state('a'), DISCOVERED)
+        self.assertEqual([job['modifiedTime'] for job in self.queue.pending()], ['2024-02-01T00:00:00.000Z'])
+    
+    def test_failure_keeps_state_and_backs_off(self):
+        self.queue.enqueue(drive_file('a'))
+        self.queue.mark('a', EXTRACTED)
+        before = time.time()
+        self.queue.fail('a', "sheet write failed")
+        
+        self.assertEqual(self.state('a'), EXTRACTED)
+        self.assertEqual(self.queue.pending(), [])
+        attempts, next_attempt, error = self.queue.conn.execute(
+            "SELECT attempts, next_attempt, last_error FROM jobs WHERE file_id = 'a'").fetchone()
+        self.assertEqual((attempts, error), (1, "sheet write failed"))
+        self.assertGreaterEqual(next_attempt, before + 60)
+        
+        self.queue.fail('a', "sheet write failed")
+        next_attempt = self.queue.conn.execute("SELECT next_attempt FROM jobs WHERE file_id = 'a'").fetchone()[0]
+        self.assertGreaterEqual(next_attempt, before + 120)
+    
+    def test_dead_letter_after_max_attempts_and_retry_failed(self):
+        self.queue.enqueue(drive_file('a'))
+        for _ in range(3):
+            self.queue.fail('a', "extract text failed")
+        self.assertEqual(self.state('a'), FAILED)
+        
+        self.assertEqual(self.queue.retry_failed(), 1)
+        self.assertEqual(self.state('a'), DISCOVERED)
+        self.assertEqual([job['id'] for job in self.queue.pending()], ['a'])
+    
+    def test_fail_without_retry_dead_letters_at_once(self):
+        self.queue.enqueue(drive_file('a'))
+        self.queue.fail('a', "file exceeds MAX_DOWNLOAD_BYTES", retry=False)
+        self.assertEqual(self.state('a'), FAILED)
+        self.assertEqual(self.queue.pending(), [])
+    
+    def test_state_survives_reopening(self):
+        self.queue.enqueue(drive_file('a'))
+        self.queue.mark('a', EXTRACTED)
+        self.queue.set_meta('last_check', '2024-01-01T00:00:00.000Z')
+        self.queue.close()
+        
+        self.queue = JobQueue()
+        self.assertEqual(self.state('a'), EXTRACTED)
+        self.assertEqual(self.queue.get_meta('last_check'), '2024-01-01T00:00:00.000Z')
+
+if __name__ == "__main__":
+    unittest.main()
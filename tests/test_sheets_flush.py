@@ -0,0 +1,107 @@
+"""Sheet writes: rows are written once and their jobs marked written, even when a write fails after landing"""
+import unittest
+from duplicate_index import DuplicateIndex
+from job_queue import JobQueue, EXTRACTED, WRITTEN
+from sheets_manager import SheetsManager
+from tests.support import use_temp_state, stub_services, fail_after_sheet_writes
+
+class SheetsFlushTest(unittest.TestCase):
+    def setUp(self):
+        use_temp_state(self)
+        self.backend, _, sheets = stub_services()
+        self.queue = JobQueue()
+        self.index = DuplicateIndex()
+        self.addCleanup(self.queue.close)
+        self.addCleanup(self.index.close)
+        self.sheets_manager = SheetsManager(buffered=True, sheets_service=sheets, job_queue=self.queue,
+                                            duplicate_index=self.index)
+    
+    def add_extracted(self, count, revision='r1'):
+        for number in range(count):
+            file_id = f"file{number}"
+            self.queue.enqueue({'id': file_id, 'name': f"CV{number}.pdf", 'modifiedTime': revision})
+            self.queue.mark(file_id, EXTRACTED)
+            self.sheets_manager.add_cv_data({'name': 'Salma Benali', 'status': 'manual_review'}, f"CV{number}.pdf",
+                                            file_id, f"md5-{number}", revision=revision)
+    
+    def test_flush_writes_rows_and_marks_jobs_written(self):
+        self.add_extracted(5)
+        self.assertEqual(self.queue.counts(), {EXTRACTED: 5})
+        self.assertTrue(self.sheets_manager.flush())
+        
+        self.assertEqual(len(self.backend.rows), 5)
+        self.assertEqual(self.queue.counts(), {WRITTEN: 5})
+        self.assertEqual(self.queue.pending(), [])
+        self.assertEqual(self.index.row_for('file4'), 6)
+    
+    def test_append_that_landed_before_failing_is_not_written_again(self):
+        self.add_extracted(5)
+        fail_after_sheet_writes(self, self.backend, ':append')
+        self.assertFalse(self.sheets_manager.flush())
+        self.assertEqual(len(self.backend.rows), 5)
+        self.assertEqual(self.queue.counts(), {EXTRACTED: 5})
+        
+        self.assertTrue(self.sheets_manager.flush())
+        self.assertEqual(len(self.backend.rows), 5)
+        self.assertEqual(self.queue.counts(), {WRITTEN: 5})
+        self.assertEqual(self.queue.pending(), [])
+        self.assertTrue(self.sheets_manager.check_duplicate('CV0.pdf', 'file0', revision='r1'))
+    
+    def test_rows_missing_after_a_failed_flush_are_retried(self):
+        self.add_extracted(3)
+        fail_after_sheet_writes(self, self.backend, ':append')
+        self.sheets_manager.flush()
+        # The appended rows were lost, e.g. deleted by hand before the retry
+        self.backend.rows.clear()
+        
+        self.assertTrue(self.sheets_manager.flush())
+        self.assertEqual(len(self.backend.rows), 3)
+        self.assertEqual(self.queue.counts(), {WRITTEN: 3})
+    
+    def test_updates_replace_rows_in_place(self):
+        self.add_extracted(2)
+        self.sheets_manager.flush()
+        self.add_extracted(2, revision='r2')
+        self.assertTrue(self.sheets_manager.flush())
+        
+        self.assertEqual(len(self.backend.rows), 2)
+        self.assertEqual([row[8] for row in self.backend.rows], ['r2', 'r2'])
+        self.assertEqual(self.queue.counts(), {WRITTEN: 2})
+
+class UnbufferedWriteTest(unittest.TestCase):
+    def setUp(self):
+        use_temp_state(self)
+        self.backend, _, sheets = stub_services()
+        self.queue = JobQueue()
+        self.index = DuplicateIndex()
+        self.addCleanup(self.queue.close)
+        self.addCleanup(self.index.close)
+        self.sheets_manager = SheetsManager(buffered=False, sheets_service=sheets, job_queue=self.queue,
+                                            duplicate_index=self.index)
+        self.queue.enqueue({'id': 'file0', 'name': 'CV.pdf', 'modifiedTime': 'r1'})
+        self.queue.mark('file0', EXTRACTED)
+    
+    def add(self):
+        return self.sheets_manager.add_cv_data({'name': 'Salma Benali'}, 'CV.pdf', 'file0', 'md5-0', revision='r1')
+    
+    def test_retry_after_an_applied_append_does_not_duplicate(self):
+        fail_after_sheet_writes(self, self.backend, ':append')
+        self.assertFalse(self.add())
+        self.assertFalse(self.sheets_manager.check_duplicate('CV.pdf', 'file0', revision='r1'))
+        
+        self.assertTrue(self.add())
+        self.assertEqual(len(self.backend.rows), 1)
+        self.assertEqual(self.queue.counts(), {WRITTEN: 1})
+        self.assertEqual(self.index.row_for('file0'), 2)
+    
+    def test_retry_after_a_lost_append_writes_the_row(self):
+        fail_after_sheet_writes(self, self.backend, ':append')
+        self.add()
+        self.backend.rows.clear()
+        
+        self.assertTrue(self.add())
+        self.assertEqual(len(self.backend.rows), 1)
+        self.assertEqual(self.queue.counts(), {WRITTEN: 1})
+
+if __name__ == "__main__":
+    unittest.main()